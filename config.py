@@ -11,6 +11,15 @@ TG_IDS = []
 # Eсли хотите получать логи в телеграм: True, а если нет: False.
 USE_TG_BOT = False
 
+# Минимальный уровень логов в консоли и в файле ("DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR").
+LOG_LEVEL = "DEBUG"
+
+# Сохранять логи в data/logs/log.jsonl (по записи JSON на строку с полями wallet, chain, dapp, action, tx_hash).
+USE_JSON_LOGS = True
+
+# Размер файла логов, после которого он архивируется и начинается новый.
+JSON_LOG_ROTATION = "50 MB"
+
 ##########################################################################
 ################################## Proxy #################################
 ##########################################################################
@@ -25,6 +34,31 @@ PROXY_CHANGE_IP_URL = ""
 ########################### Основные настройки ###########################
 ##########################################################################
 
+# Хранилище базы кошельков: "json" (data/database.json) или "sqlite" (data/database.sqlite3).
+# При первом запуске с "sqlite" кошельки импортируются из data/database.json,
+# экспорт обратно в JSON – модуль 4 в меню.
+DATABASE_BACKEND = "json"
+
+# После скольких неудачных действий подряд кошелек попадает в карантин (data/scheduler.sqlite3) и больше не берется
+# в работу, в том числе в следующих запусках, пока его не выпустить (модуль 7 в меню). После каждой неудачи кошелек
+# откладывается на время, которое удваивается с каждой следующей неудачей.
+QUARANTINE_AFTER_FAILURES = 5
+
+# Количество процессов для многопроцессного прогрева (модуль 5). Кошельки делятся между процессами по адресу.
+WARMUP_PROCESSES = 4
+
+# Количество пачек кошельков (по 50), балансы которых чекер проверяет одновременно (при USE_MOBILE_PROXY всегда 1).
+BALANCE_CHECKER_CONCURRENCY = 10
+
+# Форматы файлов в data/balances, в которые чекер построчно сохраняет балансы по мере проверки ("csv", "jsonl").
+BALANCE_CHECKER_EXPORT = ["csv", "jsonl"]
+
+# Через сколько секунд баланс кошелька перечитывается, даже если у него не менялся nonce.
+BALANCE_SNAPSHOT_MAX_AGE = 6 * 60 * 60
+
+# Как часто (в секундах) чекер перечитывает балансы всех кошельков, чтобы учесть входящие переводы.
+BALANCE_FULL_REFRESH_INTERVAL = 24 * 60 * 60
+
 # API ключ 0x.
 ZEROX_API_KEY = ""
 
@@ -34,9 +68,45 @@ MAX_SLIPPAGE = 2
 # Время задержки после отправки любой транзакции, кроме апрувов.
 TX_DELAY_RANGE = [30, 100]
 
+# Срок, к которому прогрев должен закончиться, например "2026-10-21 18:00" (None – без срока).
+# Задержки между транзакциями подбираются под срок по измеренной длительности действий вместо TX_DELAY_RANGE,
+# а многопроцессный прогрев (модуль 5) запускает столько процессов (не больше WARMUP_PROCESSES), сколько нужно к сроку.
+WARMUP_DEADLINE = None
+
+# Минимальная задержка между транзакциями (в секундах) при прогреве к сроку.
+DEADLINE_MIN_TX_DELAY = 10
+
+# Симуляция каждой транзакции через eth_call перед подписью (True, если использовать).
+# Транзакции, которые заведомо откатятся, не отправляются, и задержка после них не выполняется.
+USE_TX_SIMULATION = True
+
+# Через сколько блоков без включения транзакция считается зависшей и заменяется такой же с повышенной комиссией.
+STUCK_TX_BLOCKS = 10
+
+# Максимальное количество замен одной транзакции с повышением комиссии.
+MAX_TX_REPLACEMENTS = 3
+
+# Отменять транзакцию (перевод 0 на свой адрес с тем же nonce), если она не прошла и после всех замен (True, если использовать).
+CANCEL_STUCK_TX = True
+
+# Запас к лимиту газа, выученному по квитанциям прошлых транзакций той же функции контракта
+# (лимит = наибольший потраченный газ * GAS_LIMIT_CACHE_MULTIPLIER). Выучиваются только апрув и бриджи
+# Merkly / Stargate / CoreBridge, для свапов и новых функций газ оценивается через RPC.
+GAS_LIMIT_CACHE_MULTIPLIER = 1.3
+
 # Задержка после апрув транзакций.
 AFTER_APPROVE_DELAY_RANGE = [5, 10]
 
+# Стратегия апрува токенов для свапов и бриджей:
+# "exact" – апрув ровно на сумму транзакции,
+# "multiple" – апрув на сумму транзакции, умноженную на APPROVE_MULTIPLIER (запас на следующие транзакции),
+# "unlimited" – одноразовый бесконечный апрув.
+# Остаток апрува кэшируется локально, поэтому при достаточном запасе ни чтение allowance, ни апрув не выполняются.
+APPROVE_STRATEGY = "exact"
+
+# Множитель суммы апрува для стратегии "multiple".
+APPROVE_MULTIPLIER = 5
+
 # Процент от баланса токена, который будет использован
 # в случае, если USE_SWAP_BEFORE_BRIDGE = False, при бридже через Stargate / CoreBridge
 # будет браться баланс токена STG / USDT и умножаться на этот коэффициент.
@@ -46,9 +116,27 @@ TOKEN_USE_PERCENTAGE = 0.003
 # если баланс STG / USDT равен нулю, то свап будет проведен вне зависимости от значения этого параметра.
 USE_SWAP_BEFORE_BRIDGE = True
 
+# Балансы кошельков ведутся локально: прочитанный баланс обновляется по квитанциям своих транзакций (value + комиссия,
+# Transfer-события токенов), без повторного запроса к RPC. Раз в столько секунд баланс сверяется с сетью
+# (входящие переводы со стороны видны только после сверки).
+BALANCE_LEDGER_RECONCILE_INTERVAL = 600
+# ... и после стольких своих транзакций по кошельку в сети.
+BALANCE_LEDGER_RECONCILE_TXS = 10
+
 # Количество знаков после запятой, в случае, если число округляется.
 ROUND_TO = 5
 
+# Запись трейса по фазам каждого действия (проверка баланса, вывод с OKX, котировка 0x, апрув, свап, бридж и т.д.)
+# в файл data/trace.json. Файл открывается в chrome://tracing или ui.perfetto.dev (True, если записывать).
+USE_TRACING = False
+
+# Запись всех запросов к RPC, 0x и OKX вместе с ответами и задержками в data/cassette.jsonl.gz ("record")
+# или прогон без сети на записанных ответах ("replay"). None – обычная работа.
+CASSETTE_MODE = None
+
+# При "replay" отвечать с задержками, как при записи (True), или так быстро, как возможно (False).
+CASSETTE_REPLAY_TIMING = False
+
 ##########################################################################
 ################################### OKX ##################################
 ##########################################################################
@@ -62,6 +150,10 @@ OKX_API_SECRET = ""
 # Пароль от API ключа от OKX.
 OKX_API_PASSWORD = ""
 
+# Выводить с OKX сразу всем кошелькам, которым не хватает баланса на оставшиеся действия, до начала прогрева
+# (по сетям из USE_OKX_WITHDRAW с "use": True). Кошелек берется в работу, когда вывод на него дошел.
+USE_OKX_PREFUNDING = False
+
 # Использование вывода с OKX при бриджах.
 USE_OKX_WITHDRAW = {
     "BSC": {                        # сеть-получатель вывода (источник бриджа)
@@ -119,6 +211,16 @@ BASE_RPC_URL = ""
 CONFLUX_RPC_URL = "https://evm.confluxrpc.com"
 ZORA_RPC_URL = ""
 
+# Лимиты запросов в секунду для RPC. Для RPC, которых нет в списке, используется DEFAULT_RPC_RATE_LIMIT.
+# Сети, у RPC которых есть свободный лимит, выбираются для следующего действия чаще.
+RPC_RATE_LIMITS = {
+    "https://1rpc.io/matic": 10,
+    "https://rpc.ankr.com/bsc": 30,
+    "https://forno.celo.org": 5,
+}
+
+DEFAULT_RPC_RATE_LIMIT = 10
+
 ##########################################################################
 ########################## Количество транзакций #########################
 ##########################################################################
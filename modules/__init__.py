@@ -1,2 +1,9 @@
-from .database import Database
-from .manager import Manager
+def __getattr__(name: str):
+    # the menu has to show up instantly, so the modules are imported only when they are used
+    if name == "Database":
+        from .database import Database
+        return Database
+    if name == "Manager":
+        from .manager import Manager
+        return Manager
+    raise AttributeError(f"module 'modules' has no attribute '{name}'")
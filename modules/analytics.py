@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from sdk import logger
+from sdk.constants import ANALYTICS_PATH, ANALYTICS_LATENCY_SAMPLE_SIZE
+from sdk.metrics import ActionMetrics, set_action_metrics, reset_action_metrics
+from sdk.models.data_item import DataItem
+from sdk.models.route import Route
+from sdk.retry import classify_error
+
+REPORT_GROUPS = {
+    "route": "route || ' (' || dapp || ')'",
+    "chain": "chain",
+    "proxy": "COALESCE(proxy, 'no proxy')",
+}
+
+
+class AnalyticsStore:
+    """One row per finished warmup action (successful or not) in a local SQLite file."""
+
+    def __init__(self, file_name: str = ANALYTICS_PATH) -> None:
+        self.file_name = file_name
+        self._connection: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # opened on the first use, so processes that only import the module don't touch the file;
+        # a connection must not be used across fork(), so a forked warmup process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            directory = os.path.dirname(self.file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._connection = sqlite3.connect(self.file_name)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS actions ("
+                "started_at REAL NOT NULL, address TEXT NOT NULL, route TEXT NOT NULL, dapp TEXT NOT NULL, "
+                "chain TEXT NOT NULL, proxy TEXT, success INTEGER NOT NULL, duration REAL NOT NULL, phases TEXT, "
+                "gas_used INTEGER NOT NULL, effective_gas_price INTEGER NOT NULL, fee_paid REAL NOT NULL, "
+                "retries INTEGER NOT NULL, error_class TEXT, value_sent REAL NOT NULL DEFAULT 0)"
+            )
+
+            # stores created before the sent value was tracked
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(actions)")]
+            if "value_sent" not in columns:
+                self._connection.execute("ALTER TABLE actions ADD COLUMN value_sent REAL NOT NULL DEFAULT 0")
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def record(self, metrics: ActionMetrics) -> None:
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO actions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        metrics.started_at, metrics.address, metrics.route, metrics.dapp, metrics.chain,
+                        metrics.proxy, int(metrics.success), metrics.duration, json.dumps(metrics.phases),
+                        metrics.gas_used, metrics.effective_gas_price, metrics.fee_paid / 10 ** 18,
+                        metrics.retries, metrics.error_class, metrics.value_sent / 10 ** 18
+                    )
+                )
+        except Exception as e:
+            logger.error(f"[Analytics] Could not record action: {e}", send_to_tg=False)
+
+    def get_stats(self, group_by: str) -> List[Dict]:
+        """Success rate, p50/p95 duration and average cost per value of ``group_by`` ("route", "chain" or "proxy")."""
+        rows = self.connection.execute(
+            f"SELECT {REPORT_GROUPS[group_by]} AS name, success, duration, fee_paid, retries "
+            f"FROM actions ORDER BY name, duration"
+        )
+
+        groups: Dict[str, List[tuple]] = {}
+        for name, success, duration, fee_paid, retries in rows:
+            groups.setdefault(name, []).append((success, duration, fee_paid, retries))
+
+        stats = []
+
+        for name, actions in groups.items():
+            durations = [duration for _, duration, _, _ in actions]
+            stats.append({
+                "name": name,
+                "count": len(actions),
+                "success_rate": sum(success for success, _, _, _ in actions) / len(actions),
+                "p50": _percentile(durations, 0.5),
+                "p95": _percentile(durations, 0.95),
+                "avg_fee": sum(fee_paid for _, _, fee_paid, _ in actions) / len(actions),
+                "retries": sum(retries for _, _, _, retries in actions),
+            })
+
+        return stats
+
+    def get_average_costs(self) -> Dict[tuple[str, str], float]:
+        """Average fee plus sent value (in native coins of the source chain) of the successful actions per (dapp, route)."""
+        rows = self.connection.execute(
+            "SELECT dapp, route, AVG(fee_paid + value_sent) FROM actions WHERE success = 1 GROUP BY dapp, route"
+        )
+        return {(dapp, route): cost for dapp, route, cost in rows}
+
+    def get_mean_latency(self, limit: int = ANALYTICS_LATENCY_SAMPLE_SIZE) -> float | None:
+        """Mean duration of the latest successful actions without their delays between transactions."""
+        rows = self.connection.execute(
+            "SELECT duration, phases FROM actions WHERE success = 1 ORDER BY started_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+        if not rows:
+            return None
+
+        return sum(duration - json.loads(phases or "{}").get("tx.delay", 0) for duration, phases in rows) / len(rows)
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    index = min(int(percentile * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+@contextmanager
+def track_action(route: Route, data_item: DataItem) -> Iterator[ActionMetrics]:
+    """Collects the metrics of one warmup action and records them when the action ends.
+
+    The caller sets ``success``. A failed action is recorded with the class of its last error,
+    raised inside the block or caught by the dapp that returned ``False``.
+    """
+    metrics = ActionMetrics(
+        address=data_item.address,
+        route=route.action,
+        dapp=route.dapp,
+        chain=route.src_chain.name,
+        # only the host, so the credentials of the proxy don't end up in the report
+        proxy=data_item.proxy.split("@")[-1] if data_item.proxy else None
+    )
+    token = set_action_metrics(metrics)
+    started = time.perf_counter()
+
+    try:
+        yield metrics
+    except Exception as e:
+        metrics.add_error(classify_error(e).value, f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        # errors that were retried away don't belong to a successful action
+        if metrics.success:
+            metrics.error_class = None
+            metrics.error = None
+
+        metrics.duration = time.perf_counter() - started
+        reset_action_metrics(token)
+        analytics_store.record(metrics)
+
+
+def print_report(store: AnalyticsStore | None = None) -> None:
+    from rich.console import Console
+    from rich.table import Table
+
+    store = store or analytics_store
+    console = Console()
+
+    for group_by in REPORT_GROUPS:
+        stats = store.get_stats(group_by=group_by)
+
+        if not stats:
+            logger.warning("[Analytics] No actions recorded yet", send_to_tg=False)
+            return
+
+        table = Table(title=f"Actions by {group_by}")
+        for column in (group_by.capitalize(), "Actions", "Success", "p50, s", "p95, s", "Avg fee", "Retries"):
+            table.add_column(column)
+
+        for row in sorted(stats, key=lambda row: row["p95"], reverse=True):
+            table.add_row(
+                row["name"],
+                str(row["count"]),
+                f"{row['success_rate']:.0%}",
+                f"{row['p50']:.1f}",
+                f"{row['p95']:.1f}",
+                f"{row['avg_fee']:.6f}",
+                str(row["retries"]),
+            )
+
+        console.print(table)
+
+
+analytics_store = AnalyticsStore()
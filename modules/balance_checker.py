@@ -1,46 +1,262 @@
-from rich.console import Console
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterator, List
+
+from rich.console import Group
+from rich.live import Live
 from rich.table import Table
 
-from config import USE_MOBILE_PROXY
+from config import USE_MOBILE_PROXY, BALANCE_CHECKER_CONCURRENCY, BALANCE_CHECKER_EXPORT
 from modules import Database
-from sdk import Client, logger
-from sdk.models.chain import BSC, Gnosis, Polygon, Celo, Arbitrum, Moonbeam, Moonriver, Conflux
+from modules.balance_snapshots import BalanceSnapshots
+from sdk import logger
+from sdk.constants import BALANCE_CHECKER_BATCH_SIZE, BALANCE_CHECKER_DIR, BALANCE_CHECKER_LIVE_ROWS
+from sdk.models.chain import BSC, Gnosis, Polygon, Celo, Arbitrum, Moonbeam, Moonriver, Conflux, Chain
+from sdk.models.data_item import DataItem
+from sdk.retry import retry_engine
+from sdk.rpc import RPCClient, RPCError
 from sdk.utils import change_ip
 
+CHAINS = [BSC, Gnosis, Polygon, Celo, Arbitrum, Moonbeam, Moonriver, Conflux]
 
-async def balance_checker():
-    database = Database.read_from_json()
-    data_index = 0
 
-    table = Table(title="Balance checker")
-    chains = [BSC, Gnosis, Polygon, Celo, Arbitrum, Moonbeam, Moonriver, Conflux]
+class BalanceWriter:
+    """Appends every checked wallet to CSV and/or JSONL files as soon as it is done."""
+
+    def __init__(self, chains: List[Chain], formats: List[str] = BALANCE_CHECKER_EXPORT) -> None:
+        os.makedirs(BALANCE_CHECKER_DIR, exist_ok=True)
+        file_name = os.path.join(BALANCE_CHECKER_DIR, time.strftime("balances_%Y%m%d_%H%M%S"))
+
+        self.columns = ["address", "status"] + [chain.name for chain in chains]
+        self.paths = []
+        self._csv_file = None
+        self._csv_writer = None
+        self._jsonl_file = None
+
+        if "csv" in formats:
+            self._csv_file = open(f"{file_name}.csv", "w", newline="")
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=self.columns)
+            self._csv_writer.writeheader()
+            self.paths.append(self._csv_file.name)
+
+        if "jsonl" in formats:
+            self._jsonl_file = open(f"{file_name}.jsonl", "w")
+            self.paths.append(self._jsonl_file.name)
+
+    def write(self, row: Dict[str, str | float | None]) -> None:
+        if self._csv_writer is not None:
+            self._csv_writer.writerow(row)
+            self._csv_file.flush()
+
+        if self._jsonl_file is not None:
+            self._jsonl_file.write(json.dumps(row) + "\n")
+            self._jsonl_file.flush()
+
+    def close(self) -> None:
+        for file in (self._csv_file, self._jsonl_file):
+            if file is not None:
+                file.close()
+
+
+class BalanceTable:
+    """Live view with the last checked wallets and the totals, its size doesn't depend on the number of wallets."""
+
+    def __init__(self, chains: List[Chain], total: int, max_rows: int = BALANCE_CHECKER_LIVE_ROWS) -> None:
+        self.chains = chains
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.rows = deque(maxlen=max_rows)
+
+    def add(self, row: Dict[str, str | float | None]) -> None:
+        self.done += 1
+        self.errors += row["status"] != "ok"
+        self.rows.append(row)
+
+    def __rich__(self) -> Group:
+        table = Table(title="Balance checker")
+        table.add_column("Address")
+
+        for chain in self.chains:
+            table.add_column(chain.name)
+
+        for row in self.rows:
+            cells = [_format_balance(row[chain.name]) for chain in self.chains]
+            table.add_row(row["address"], *cells, style="bright_green" if row["status"] == "ok" else "red")
+
+        return Group(table, f"Checked {self.done}/{self.total} wallets, errors: {self.errors}")
+
+
+def _format_balance(balance: str | float | None) -> str:
+    if balance is None:
+        return "error"
+    if isinstance(balance, float):
+        return str(round(balance, 5))
+    return balance
+
+
+async def get_chain_balances(
+        items: List[DataItem],
+        chain: Chain,
+        snapshots: BalanceSnapshots,
+        full_refresh: bool
+) -> List[str | float | None]:
+    """Balances of a chunk of wallets on one chain, ``None`` for the wallets that couldn't be checked.
+
+    Wallets are batched per proxy, so no request links wallets that use different proxies.
+    """
+    if not chain.rpc:
+        return ["no RPC"] * len(items)
+
+    groups: Dict[str | None, List[int]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(item.proxy, []).append(index)
+
+    group_balances = await asyncio.gather(*[
+        get_proxy_balances(
+            items=[items[index] for index in indexes],
+            chain=chain,
+            proxy=proxy,
+            snapshots=snapshots,
+            full_refresh=full_refresh
+        )
+        for proxy, indexes in groups.items()
+    ])
+
+    result: List[str | float | None] = [None] * len(items)
+
+    for indexes, balances in zip(groups.values(), group_balances):
+        for index, balance in zip(indexes, balances):
+            result[index] = balance
+
+    return result
+
+
+async def get_proxy_balances(
+        items: List[DataItem],
+        chain: Chain,
+        proxy: str | None,
+        snapshots: BalanceSnapshots,
+        full_refresh: bool
+) -> List[float | None]:
+    """Balances of wallets that share ``proxy`` on one chain.
+
+    Nonces of all the wallets are read in one batch and balances are re-read only for the wallets
+    whose snapshot is stale, the rest is served from the snapshots.
+    """
+    try:
+        async with RPCClient(url=chain.rpc, proxy=proxy) as rpc:
+            calls = [("eth_blockNumber", [])]
+            calls += [("eth_getTransactionCount", [item.address, "latest"]) for item in items]
+
+            # transient errors are retried by the engine, after its retry budget the cells are marked as errored
+            block, *nonces = await retry_engine.run(rpc.batch, calls, endpoint=chain.rpc)
+
+            if isinstance(block, RPCError):
+                raise block
+
+            block = int(block, 16)
+            nonces = [None if isinstance(nonce, RPCError) else int(nonce, 16) for nonce in nonces]
+
+            stale = [
+                index for index, (item, nonce) in enumerate(zip(items, nonces))
+                if full_refresh or snapshots.is_stale(item.address, chain.name, nonce)
+            ]
+
+            balances = await retry_engine.run(
+                rpc.batch,
+                [("eth_getBalance", [items[index].address, hex(block)]) for index in stale],
+                endpoint=chain.rpc
+            )
+    except Exception as ex:
+        logger.error(f"[Balance checker] {chain.name}: {ex}", send_to_tg=False)
+        return [None] * len(items)
+
+    for index, balance in zip(stale, balances):
+        if isinstance(balance, RPCError):
+            logger.error(f"[Balance checker] {items[index].address} on {chain.name}: {balance}", send_to_tg=False)
+            snapshots.wallets.get(items[index].address, {}).pop(chain.name, None)
+        else:
+            snapshots.set(items[index].address, chain.name, balance=int(balance, 16), nonce=nonces[index], block=block)
+
+    result = []
+
+    for item in items:
+        snapshot = snapshots.get(item.address, chain.name)
+        result.append(snapshot["balance"] / 10 ** 18 if snapshot is not None else None)
+
+    return result
+
+
+async def get_chunk_balances(
+        items: List[DataItem],
+        chains: List[Chain],
+        snapshots: BalanceSnapshots,
+        full_refresh: bool
+) -> List[Dict[str, str | float | None]]:
+    chain_balances = await asyncio.gather(*[
+        get_chain_balances(items=items, chain=chain, snapshots=snapshots, full_refresh=full_refresh)
+        for chain in chains
+    ])
+
     rows = []
 
-    logger.info("Please wait")
+    for item, balances in zip(items, zip(*chain_balances)):
+        row = {"address": item.address, "status": "ok" if None not in balances else "error"}
+        row.update(zip([chain.name for chain in chains], balances))
+        rows.append(row)
+
+    return rows
+
+
+def _get_chunks(items: List[DataItem], size: int) -> Iterator[List[DataItem]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 
-    while data_index < len(database.data):
-        try:
+async def balance_checker():
+    database = Database.read()
+    snapshots = BalanceSnapshots.load()
+    chains = CHAINS
+
+    # incoming transfers don't change the nonce, so from time to time every balance is re-read
+    full_refresh = snapshots.full_refresh_due
+    if full_refresh:
+        logger.info("[Balance checker] Full refresh of all balances", send_to_tg=False)
+
+    # with a mobile proxy the ip is changed before every chunk, so chunks can't be checked in parallel
+    concurrency = 1 if USE_MOBILE_PROXY else BALANCE_CHECKER_CONCURRENCY
+
+    table = BalanceTable(chains=chains, total=len(database.data))
+    writer = BalanceWriter(chains=chains)
+    chunks = _get_chunks(database.data, size=BALANCE_CHECKER_BATCH_SIZE)
+
+    async def worker(live: Live) -> None:
+        for items in chunks:
             if USE_MOBILE_PROXY:
                 await change_ip()
 
-            data_item = database.data[data_index]
-            row = []
-
-            for chain in chains:
-                client = Client(private_key=data_item.private_key, proxy=data_item.proxy, chain=chain)
-                balance = await client.get_native_balance(chain=chain) / 10 ** 18
-                row.append(str(round(balance, 5)))
+            for row in await get_chunk_balances(items=items, chains=chains, snapshots=snapshots, full_refresh=full_refresh):
+                writer.write(row)
+                table.add(row)
 
-            data_index += 1
-            rows.append(row)
-        except Exception as ex:
-            logger.exception(f"[Balance checker] Error occurred: {ex}")
+            live.refresh()
 
-    for chain in chains:
-        table.add_column(chain.name)
+    try:
+        with Live(table, auto_refresh=False) as live:
+            await asyncio.gather(*[worker(live) for _ in range(concurrency)])
 
-    for row in rows:
-        table.add_row(*row, style='bright_green')
+        if full_refresh and not table.errors:
+            snapshots.full_refresh_at = time.time()
+    finally:
+        writer.close()
+        snapshots.save()
 
-    console = Console()
-    console.print(table)
+    if writer.paths:
+        logger.success(f"[Balance checker] Saved to {', '.join(writer.paths)}", send_to_tg=False)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Dict
+
+from config import BALANCE_SNAPSHOT_MAX_AGE, BALANCE_FULL_REFRESH_INTERVAL
+from sdk import logger
+from sdk.constants import BALANCE_SNAPSHOTS_PATH
+
+
+class BalanceSnapshots:
+    """Last known native balance, nonce and block per wallet and chain, kept between balance checker runs.
+
+    An outgoing transaction always changes the nonce, so a wallet with an unchanged nonce only needs
+    a new balance read when its snapshot is old or a periodic full refresh (for incoming transfers) is due.
+    """
+
+    def __init__(self, file_name: str = BALANCE_SNAPSHOTS_PATH) -> None:
+        self.file_name = file_name
+        self.full_refresh_at = 0.0
+        self.wallets: Dict[str, Dict[str, dict]] = {}
+
+    @classmethod
+    def load(cls, file_name: str = BALANCE_SNAPSHOTS_PATH) -> "BalanceSnapshots":
+        snapshots = cls(file_name=file_name)
+
+        if not os.path.exists(file_name):
+            return snapshots
+
+        try:
+            with open(file_name, "r") as json_file:
+                data = json.load(json_file)
+
+            snapshots.full_refresh_at = data["full_refresh_at"]
+            snapshots.wallets = data["wallets"]
+        except Exception as e:
+            logger.error(f"[Balance checker] Could not read balance snapshots: {e}")
+
+        return snapshots
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file_name = f"{self.file_name}.tmp"
+
+        with open(temp_file_name, "w") as json_file:
+            json.dump({"full_refresh_at": self.full_refresh_at, "wallets": self.wallets}, json_file)
+
+        os.replace(temp_file_name, self.file_name)
+
+    @property
+    def full_refresh_due(self) -> bool:
+        return time.time() - self.full_refresh_at >= BALANCE_FULL_REFRESH_INTERVAL
+
+    def get(self, address: str, chain_name: str) -> dict | None:
+        return self.wallets.get(address, {}).get(chain_name)
+
+    def set(self, address: str, chain_name: str, balance: int, nonce: int | None, block: int) -> None:
+        self.wallets.setdefault(address, {})[chain_name] = {
+            "balance": balance,
+            "nonce": nonce,
+            "block": block,
+            "checked_at": time.time(),
+        }
+
+    def is_stale(self, address: str, chain_name: str, nonce: int | None) -> bool:
+        snapshot = self.get(address, chain_name)
+
+        return (
+            snapshot is None
+            or nonce is None
+            or snapshot["nonce"] != nonce
+            or time.time() - snapshot["checked_at"] >= BALANCE_SNAPSHOT_MAX_AGE
+        )
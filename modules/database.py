@@ -1,22 +1,27 @@
+from __future__ import annotations
+
 import itertools
-import json
 import random
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set
 
-from config import USE_MOBILE_PROXY, STARGATE_TX_COUNT, CORE_TX_COUNT, MERKLY_TX_COUNT
-from sdk import logger, Client
+from config import USE_MOBILE_PROXY
+from sdk import logger
 from sdk.constants import PRIVATE_KEYS_PATH, PROXIES_PATH, DEPOSIT_ADDRESSES_PATH, DATABASE_PATH
 from sdk.models.data_item import DataItem
+from sdk.models.route import ROUTES
+from sdk.signer import signer
 from sdk.utils import read_from_txt
+from modules.storage import JsonStorage, SqliteStorage, get_storage
 
 
 @dataclass
 class Database:
     data: List[DataItem]
+    storage: JsonStorage | SqliteStorage = field(default_factory=get_storage)
 
     def _to_dict(self) -> List[Dict[str, Any]]:
-        return [vars(data_item) for data_item in self.data]
+        return [data_item.to_dict() for data_item in self.data]
 
     @staticmethod
     def create_database() -> "Database":
@@ -29,20 +34,20 @@ class Database:
         if USE_MOBILE_PROXY:
             proxies = proxies * len(private_keys)
 
+        signer.derive_addresses([private_key for private_key in private_keys if private_key])
+
         for private_key, proxy, deposit_address in itertools.zip_longest(
                 private_keys, proxies, deposit_addresses, fillvalue=None
         ):
             try:
-                temp_client = Client(private_key=private_key, proxy=proxy)
-
                 item = DataItem(
                     private_key=private_key,
-                    address=temp_client.address,
+                    address=signer.derive_address(private_key=private_key),
                     proxy=proxy,
                     deposit_address=deposit_address,
                     merkly_tx_count=Database.get_randomized_merkly_tx_counts(),
-                    stargate_tx_count=random.randint(*STARGATE_TX_COUNT["Polygon-Kava"]['tx-range']),
-                    core_bridge_tx_count=random.randint(*CORE_TX_COUNT["BSC-Core"]['tx-range'])
+                    stargate_tx_count=Database.get_randomized_tx_count("Polygon-Kava", "Stargate"),
+                    core_bridge_tx_count=Database.get_randomized_tx_count("BSC-Core", "CoreBridge")
                 )
 
                 data.append(item)
@@ -52,40 +57,53 @@ class Database:
         logger.success(f"[Database] Created successfully", send_to_tg=False)
         return Database(data=data)
 
-    def save_database(self, file_name: str = DATABASE_PATH):
-        db_dict = self._to_dict()
+    def save_database(self, file_name: str = None):
+        if file_name is not None:
+            JsonStorage(file_name=file_name).save_all(self.data)
+            return
 
-        with open(file_name, "w") as json_file:
-            json.dump(db_dict, json_file, indent=4)
+        self.storage.save_all(self.data)
+
+    def save_item(self, data_item: DataItem):
+        self.storage.save_item(data_item, self.data)
+
+    @classmethod
+    def read(cls) -> "Database":
+        storage = get_storage()
+        db_dict = storage.load()
+
+        # the JSON database is imported once, an empty store after a finished run stays empty
+        if isinstance(storage, SqliteStorage) and not storage.imported:
+            db_dict = storage.import_json(file_name=DATABASE_PATH)
+            database = cls._from_dicts(db_dict=db_dict, storage=storage)
+            database.save_database()
+            return database
+
+        return cls._from_dicts(db_dict=db_dict, storage=storage)
 
     @classmethod
     def read_from_json(cls, file_name: str = DATABASE_PATH) -> "Database":
-        try:
-            with open(file_name, "r") as json_file:
-                db_dict = json.load(json_file)
-        except Exception as e:
-            logger.error(f"[Database] {e}")
+        storage = JsonStorage(file_name=file_name)
+        return cls._from_dicts(db_dict=storage.load(), storage=storage)
 
+    @classmethod
+    def _from_dicts(cls, db_dict: List[Dict[str, Any]], storage: JsonStorage | SqliteStorage) -> "Database":
         data = []
 
-        for item in db_dict:
-            account_data = {
-                "private_key": item.pop("private_key"),
-                "proxy": item.pop("proxy"),
-            }
+        signer.derive_addresses([item["private_key"] for item in db_dict])
 
+        for item in db_dict:
+            private_key = item.pop("private_key")
             item.pop("address")
 
-            account = Client(**account_data)
             data_item = DataItem(
-                private_key=account.private_key,
-                address=account.address,
-                proxy=account_data["proxy"],
+                private_key=private_key,
+                address=signer.derive_address(private_key=private_key),
                 **item
             )
             data.append(data_item)
 
-        return cls(data=data)
+        return cls(data=data, storage=storage)
 
     def get_random_item_by_criteria(self, **kwargs) -> Optional[tuple[DataItem, int]]:
         filtered_items = self.query_items_by_criteria(**kwargs)
@@ -100,6 +118,7 @@ class Database:
     def delete_item_if_finished(self, data_item: DataItem) -> bool:
         if data_item.get_tx_count() == 0:
             self.data.remove(data_item)
+            self.storage.delete_item(data_item, self.data)
             return True
         return False
 
@@ -110,6 +129,12 @@ class Database:
         return None
 
     def query_items_by_criteria(self, **kwargs) -> List[DataItem]:
+        addresses = self.storage.query_addresses(**kwargs)
+
+        if addresses is not None:
+            items_by_address = {item.address: item for item in self.data}
+            return [items_by_address[address] for address in addresses if address in items_by_address]
+
         filtered_items = []
 
         for item in self.data:
@@ -118,7 +143,14 @@ class Database:
 
         return filtered_items
 
-    def get_random_data_item(self) -> Optional[tuple[DataItem, int]]:
+    def get_random_data_item(self, exclude: Set[str] | None = None) -> Optional[tuple[DataItem, int]]:
+        if exclude:
+            indexes = [index for index, item in enumerate(self.data) if item.address not in exclude]
+            if indexes:
+                random_index = random.choice(indexes)
+                return self.data[random_index], random_index
+            return None, None
+
         if self.data:
             random_index = random.randrange(len(self.data))
             return self.data[random_index], random_index
@@ -131,7 +163,7 @@ class Database:
             for key, value in kwargs.items():
                 setattr(item, key, value)
 
-            self.save_database()
+            self.save_item(item)
         else:
             logger.error(f"[Database] Invalid item index: {item_index}")
 
@@ -147,77 +179,21 @@ class Database:
             item.to_polygon_ageur_bridged = False
             item.polygon_to_usdc_swapped = False
             item.sent_to_okx = False
-            self.save_database()
+            self.save_item(item)
         else:
             logger.error(f"[Database] Invalid item index: {item_index}")
 
     @staticmethod
     def get_randomized_merkly_tx_counts():
-        return {
-            "BSC": {
-                "Gnosis": random.randint(*MERKLY_TX_COUNT["BSC"]["Gnosis"]["tx-range"]),
-                "Celo": random.randint(*MERKLY_TX_COUNT["BSC"]["Celo"]["tx-range"]),
-                "Kava": random.randint(*MERKLY_TX_COUNT["BSC"]["Kava"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["BSC"]["Linea"]["tx-range"]),
-                "Base": random.randint(*MERKLY_TX_COUNT["BSC"]["Base"]["tx-range"]),
-                "Scroll": random.randint(*MERKLY_TX_COUNT["BSC"]["Scroll"]["tx-range"]),
-                "DFK": random.randint(*MERKLY_TX_COUNT["BSC"]["DFK"]["tx-range"]),
-                "Harmony": random.randint(*MERKLY_TX_COUNT["BSC"]["Harmony"]["tx-range"])
-            },
-            "Polygon": {
-                "Gnosis": random.randint(*MERKLY_TX_COUNT["Polygon"]["Gnosis"]["tx-range"]),
-                "Celo": random.randint(*MERKLY_TX_COUNT["Polygon"]["Celo"]["tx-range"]),
-                "BSC": random.randint(*MERKLY_TX_COUNT["Polygon"]["BSC"]["tx-range"]),
-                "Kava": random.randint(*MERKLY_TX_COUNT["Polygon"]["Kava"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["Polygon"]["Linea"]["tx-range"]),
-                "Base": random.randint(*MERKLY_TX_COUNT["Polygon"]["Base"]["tx-range"]),
-                "Zora": random.randint(*MERKLY_TX_COUNT["Polygon"]["Zora"]["tx-range"]),
-                "Scroll": random.randint(*MERKLY_TX_COUNT["Polygon"]["Scroll"]["tx-range"]),
-                "DFK": random.randint(*MERKLY_TX_COUNT["Polygon"]["DFK"]["tx-range"]),
-                "Harmony": random.randint(*MERKLY_TX_COUNT["Polygon"]["Harmony"]["tx-range"]),
-            },
-            "Celo": {
-                "Gnosis": random.randint(*MERKLY_TX_COUNT["Celo"]["Gnosis"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["Celo"]["Linea"]["tx-range"]),
-                "BSC": random.randint(*MERKLY_TX_COUNT["Celo"]["BSC"]["tx-range"])
-            },
-            "Gnosis": {
-                "Celo": random.randint(*MERKLY_TX_COUNT["Gnosis"]["Celo"]["tx-range"]),
-                "BSC": random.randint(*MERKLY_TX_COUNT["Gnosis"]["BSC"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["Gnosis"]["Linea"]["tx-range"]),
-                "Base": random.randint(*MERKLY_TX_COUNT["Gnosis"]["Base"]["tx-range"]),
-                "Scroll": random.randint(*MERKLY_TX_COUNT["Gnosis"]["Scroll"]["tx-range"])
-            },
-            "Arbitrum": {
-                "Gnosis": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Gnosis"]["tx-range"]),
-                "Celo": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Celo"]["tx-range"]),
-                "BSC": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["BSC"]["tx-range"]),
-                "Kava": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Kava"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Linea"]["tx-range"]),
-                "Base": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Base"]["tx-range"]),
-                "Zora": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Zora"]["tx-range"]),
-                "Scroll": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Scroll"]["tx-range"]),
-                "DFK": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["DFK"]["tx-range"]),
-                "Harmony": random.randint(*MERKLY_TX_COUNT["Arbitrum"]["Harmony"]["tx-range"])
-            },
-            "Moonbeam": {
-                "Gnosis": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["Gnosis"]["tx-range"]),
-                "Celo": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["Celo"]["tx-range"]),
-                "BSC": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["BSC"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["Linea"]["tx-range"]),
-                "Base": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["Base"]["tx-range"]),
-                "Scroll": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["Scroll"]["tx-range"]),
-                "DFK": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["DFK"]["tx-range"]),
-                "Harmony": random.randint(*MERKLY_TX_COUNT["Moonbeam"]["Harmony"]["tx-range"])
-            },
-            "Moonriver": {
-                "BSC": random.randint(*MERKLY_TX_COUNT["Moonriver"]["BSC"]["tx-range"]),
-                "Kava": random.randint(*MERKLY_TX_COUNT["Moonriver"]["Kava"]["tx-range"]),
-                "Linea": random.randint(*MERKLY_TX_COUNT["Moonriver"]["Linea"]["tx-range"]),
-                "Base": random.randint(*MERKLY_TX_COUNT["Moonriver"]["Base"]["tx-range"]),
-                "Scroll": random.randint(*MERKLY_TX_COUNT["Moonriver"]["Scroll"]["tx-range"])
-            },
-            "Conflux": {
-                "Celo": random.randint(*MERKLY_TX_COUNT["Conflux"]["Celo"]["tx-range"])
-            }
-        }
+        merkly_tx_count = {}
+
+        for route in ROUTES.get_by_dapp("Merkly"):
+            src_chain, dst_chain = route.action.split("-")
+            merkly_tx_count.setdefault(src_chain, {})[dst_chain] = random.randint(*route.tx_range)
+
+        return merkly_tx_count
+
+    @staticmethod
+    def get_randomized_tx_count(action: str, dapp: str) -> int:
+        route = ROUTES.get(action, dapp)
+        return random.randint(*route.tx_range) if route is not None else 0
@@ -1,7 +1,5 @@
-from modules import Database
-from modules.balance_checker import balance_checker
-from modules.warmup import Warmup
 from sdk import logger
+from sdk.constants import DATABASE_PATH
 
 
 class Manager:
@@ -12,12 +10,39 @@ class Manager:
             module = input("Start module: ")
 
             if module == "1":
+                from modules.database import Database
+
                 database = Database.create_database()
                 database.save_database()
             elif module == "2":
+                from modules.warmup import Warmup
+
                 await Warmup.execute_mode()
             elif module == "3":
+                from modules.balance_checker import balance_checker
+
                 await balance_checker()
+            elif module == "4":
+                from modules.database import Database
+
+                Database.read().save_database(file_name=DATABASE_PATH)
+                logger.success(f"[Database] Exported to {DATABASE_PATH}", send_to_tg=False)
+            elif module == "5":
+                from modules.sharded_runner import ShardedRunner
+
+                await ShardedRunner.run()
+            elif module == "6":
+                from modules.analytics import print_report
+
+                print_report()
+            elif module == "7":
+                from modules.scheduler import failure_scheduler
+
+                for address, state in failure_scheduler.get_quarantined().items():
+                    logger.info(f"[Scheduler] {address}: {'; '.join(state.reasons)}", send_to_tg=False)
+
+                released = failure_scheduler.release()
+                logger.success(f"[Scheduler] Released {released} quarantined wallets", send_to_tg=False)
             else:
                 logger.error(f"Invalid module number: {module}", send_to_tg=False)
 
@@ -25,6 +50,10 @@ class Manager:
             logger.error("Finishing script", send_to_tg=False)
         except Exception as e:
             logger.exception(str(e))
+        finally:
+            from sdk.cassette import cassette
+
+            cassette.close()
 
 
 start_message = r"""
@@ -38,4 +67,8 @@ start_message = r"""
 1. Create database
 2. Warmup (Merkly / Stargate / CoreBridge)
 3. Balance checker
+4. Export database to JSON
+5. Warmup in several processes
+6. Analytics report
+7. Release quarantined wallets
 """
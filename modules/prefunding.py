@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List, Set
+
+from config import USE_OKX_WITHDRAW, OKX_API_KEY, OKX_API_SECRET, OKX_API_PASSWORD, ROUND_TO
+from modules.analytics import analytics_store
+from modules.balance_snapshots import BalanceSnapshots
+from sdk import logger
+from sdk.balance_ledger import balance_ledger
+from sdk.constants import (
+    BALANCE_CHECKER_BATCH_SIZE,
+    OKX_WITHDRAWALS_PER_SECOND,
+    PREFUNDING_FEE_MARGIN,
+    PREFUNDING_PATH,
+    PREFUNDING_PENDING_MAX_AGE,
+    PREFUNDING_POLL_INTERVAL
+)
+from sdk.models.chain import Chain, NAMES_TO_CHAINS
+from sdk.models.data_item import DataItem
+from sdk.models.route import ROUTES
+from sdk.rate_limiter import TokenBucket
+
+
+def get_prefunded_chains() -> List[Chain]:
+    return [NAMES_TO_CHAINS[name] for name, params in USE_OKX_WITHDRAW.items() if params["use"]]
+
+
+async def get_balances(items: List[DataItem], chain: Chain, snapshots: BalanceSnapshots) -> List[float | None]:
+    from modules.balance_checker import get_chain_balances
+
+    chunks = [items[index:index + BALANCE_CHECKER_BATCH_SIZE] for index in range(0, len(items), BALANCE_CHECKER_BATCH_SIZE)]
+    balances = await asyncio.gather(*[
+        get_chain_balances(items=chunk, chain=chain, snapshots=snapshots, full_refresh=True) for chunk in chunks
+    ])
+    return [balance for chunk_balances in balances for balance in chunk_balances]
+
+
+class Prefunder:
+    """Withdraws from OKX up front what every wallet needs for its remaining actions, instead of one wallet at a time.
+
+    Balances of all wallets are read in batches, the need of a wallet on a chain is the measured average cost
+    (fee and sent value) of its remaining routes from that chain (from the analytics store) times
+    ``PREFUNDING_FEE_MARGIN``, but at least the "min-balance" of ``USE_OKX_WITHDRAW``. Withdrawals are paced to ``OKX_WITHDRAWALS_PER_SECOND`` and
+    remembered in ``PREFUNDING_PATH`` until the funds arrive, so an interrupted run doesn't withdraw twice.
+    """
+
+    def __init__(self, file_name: str = PREFUNDING_PATH) -> None:
+        self.file_name = file_name
+        # address -> chain name -> {"amount", "balance", "submitted_at"}
+        self.pending: Dict[str, Dict[str, dict]] = {}
+        # (address, chain name) of the withdrawals that arrived or expired in this process
+        self._finished: Set[tuple[str, str]] = set()
+        self._bucket = TokenBucket(rate=OKX_WITHDRAWALS_PER_SECOND)
+
+    def _read(self) -> Dict[str, Dict[str, dict]]:
+        if not os.path.exists(self.file_name):
+            return {}
+
+        try:
+            with open(self.file_name, "r") as json_file:
+                return json.load(json_file)
+        except Exception as e:
+            logger.error(f"[Prefunding] Could not read pending withdrawals: {e}")
+            return {}
+
+    def load(self) -> None:
+        self.pending = self._read()
+        self._expire()
+
+    def save(self) -> None:
+        """Writes the pending withdrawals, merged with the ones written by the other warmup processes."""
+        for address, chains in self._read().items():
+            for chain_name, withdrawal in chains.items():
+                if (address, chain_name) not in self._finished:
+                    self.pending.setdefault(address, {}).setdefault(chain_name, withdrawal)
+
+        directory = os.path.dirname(self.file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_file_name = f"{self.file_name}.{os.getpid()}.tmp"
+
+        with open(temp_file_name, "w") as json_file:
+            json.dump(self.pending, json_file)
+
+        os.replace(temp_file_name, self.file_name)
+
+    def _remove(self, address: str, chain_name: str) -> None:
+        del self.pending[address][chain_name]
+        self._finished.add((address, chain_name))
+
+        if not self.pending[address]:
+            del self.pending[address]
+
+    def _expire(self) -> None:
+        # a withdrawal that hasn't arrived for hours was rejected or lost, the wallet may be funded again
+        expired = [
+            (address, chain_name, withdrawal)
+            for address, chains in self.pending.items()
+            for chain_name, withdrawal in chains.items()
+            if time.time() - withdrawal["submitted_at"] >= PREFUNDING_PENDING_MAX_AGE
+        ]
+
+        for address, chain_name, withdrawal in expired:
+            logger.warning(
+                f"[Prefunding] {withdrawal['amount']} to {address} on {chain_name} hasn't arrived, not waiting for it",
+                send_to_tg=False
+            )
+            self._remove(address=address, chain_name=chain_name)
+
+        if expired:
+            self.save()
+
+    def get_pending_addresses(self) -> Set[str]:
+        self._expire()
+        return set(self.pending)
+
+    @staticmethod
+    def get_needs(items: List[DataItem], chain: Chain) -> List[float]:
+        average_costs = analytics_store.get_average_costs()
+        needs = []
+
+        for item in items:
+            need = 0.0
+
+            for route_id in item.active_route_ids:
+                route = ROUTES[route_id]
+                # amount-range is not in the coin of the source chain (Merkly: destination coin, bridges: the token),
+                # routes without measured actions are covered by min-balance only, the warmup withdraws again when
+                # the balance falls under it
+                cost = average_costs.get((route.dapp, route.action))
+                if route.src_chain.name == chain.name and cost is not None:
+                    need += item.get_count(route_id) * cost
+
+            needs.append(max(need * PREFUNDING_FEE_MARGIN, USE_OKX_WITHDRAW[chain.name]["min-balance"]))
+
+        return needs
+
+    def _mark_arrived(self, items: List[DataItem], chain: Chain, balances: List[float | None]) -> None:
+        arrived = False
+
+        for item, balance in zip(items, balances):
+            withdrawal = self.pending.get(item.address, {}).get(chain.name)
+
+            if withdrawal is None or balance is None or balance <= withdrawal["balance"]:
+                continue
+
+            logger.info(f"[Prefunding] {withdrawal['amount']} {chain.coin_symbol} arrived to {item.address}", send_to_tg=False)
+            balance_ledger.invalidate(address=item.address, chain_id=chain.chain_id)
+            self._remove(address=item.address, chain_name=chain.name)
+            arrived = True
+
+        if arrived:
+            self.save()
+
+    async def submit(self, items: List[DataItem]) -> None:
+        from sdk.okx import OKX
+
+        self.load()
+        snapshots = BalanceSnapshots.load()
+        okx = OKX(api_key=OKX_API_KEY, secret=OKX_API_SECRET, password=OKX_API_PASSWORD, client=None)
+
+        for chain in get_prefunded_chains():
+            chain_items = [
+                item for item in items
+                if any(ROUTES[route_id].src_chain.name == chain.name for route_id in item.active_route_ids)
+            ]
+
+            if not chain_items:
+                continue
+
+            balances = await get_balances(items=chain_items, chain=chain, snapshots=snapshots)
+            self._mark_arrived(items=chain_items, chain=chain, balances=balances)
+
+            params = USE_OKX_WITHDRAW[chain.name]
+            plan = []
+
+            for item, balance, need in zip(chain_items, balances, self.get_needs(chain_items, chain)):
+                if balance is None or balance > need or chain.name in self.pending.get(item.address, {}):
+                    continue
+
+                # the configured amount, raised to the shortfall but never above the configured maximum
+                amount = min(max(random.uniform(*params["amount"]), need - balance), params["amount"][1])
+                plan.append((item, round(amount, ROUND_TO), balance))
+
+            if not plan:
+                continue
+
+            logger.info(
+                f"[Prefunding] {len(plan)} withdrawals of {sum(amount for _, amount, _ in plan):.4f} {chain.coin_symbol} "
+                f"to {chain.name}",
+                send_to_tg=False
+            )
+
+            for item, amount, balance in plan:
+                await self._bucket.acquire()
+
+                withdrawal_id = await okx.submit_withdrawal(
+                    amount_to_withdraw=amount,
+                    token=chain.coin_symbol,
+                    chain=chain,
+                    address=item.address
+                )
+
+                if withdrawal_id:
+                    self.pending.setdefault(item.address, {})[chain.name] = {
+                        "amount": amount,
+                        "balance": balance,
+                        "submitted_at": time.time(),
+                    }
+                    self.save()
+
+        snapshots.save()
+        self.save()
+
+    async def watch(self, items: List[DataItem]) -> None:
+        """Re-reads the balances of the wallets waiting for a withdrawal until all of them are funded."""
+        snapshots = BalanceSnapshots()
+        addresses = {item.address for item in items}
+
+        while addresses.intersection(self.get_pending_addresses()):
+            await asyncio.sleep(PREFUNDING_POLL_INTERVAL)
+
+            for chain in get_prefunded_chains():
+                waiting = [item for item in items if chain.name in self.pending.get(item.address, {})]
+
+                if waiting:
+                    balances = await get_balances(items=waiting, chain=chain, snapshots=snapshots)
+                    self._mark_arrived(items=waiting, chain=chain, balances=balances)
+
+
+prefunder = Prefunder()
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Set
+
+from config import QUARANTINE_AFTER_FAILURES
+from sdk import logger
+from sdk.constants import (
+    FAILURE_BACKOFF_BASE,
+    FAILURE_BACKOFF_MAX,
+    FAILURE_REASONS_KEPT,
+    ROUTE_FAILURES_BEFORE_BACKOFF,
+    SCHEDULER_PATH
+)
+from sdk.models.data_item import DataItem
+from sdk.models.route import ROUTES, Route
+
+
+@dataclass
+class WalletState:
+    failures: int = 0
+    eligible_at: float = 0.0
+    quarantined: bool = False
+    reasons: List[str] = field(default_factory=list)
+    # consecutive failures and re-eligibility time per route, keyed by "dapp action"
+    routes: Dict[str, dict] = field(default_factory=dict)
+
+
+def get_backoff(failures: int) -> float:
+    return random.uniform(0.5, 1) * min(FAILURE_BACKOFF_BASE * 2 ** (failures - 1), FAILURE_BACKOFF_MAX)
+
+
+def _route_key(route: Route) -> str:
+    return f"{route.dapp} {route.action}"
+
+
+class FailureScheduler:
+    """Keeps failing wallets and routes out of the warmup for an exponentially growing time.
+
+    Every failed action postpones its wallet and the route for this wallet, a route that fails for
+    ``ROUTE_FAILURES_BEFORE_BACKOFF`` wallets in a row is postponed for everyone. A wallet that failed
+    ``QUARANTINE_AFTER_FAILURES`` actions in a row is quarantined with the failure reasons and is not picked
+    again, also in later runs, until it is released. Wallet state is kept in SQLite, so it survives restarts
+    and is shared by the processes of the sharded runner.
+    """
+
+    def __init__(self, file_name: str = SCHEDULER_PATH, max_failures: int = QUARANTINE_AFTER_FAILURES) -> None:
+        self.file_name = file_name
+        self.max_failures = max_failures
+        self._connection: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        self._wallets: Dict[str, WalletState] | None = None
+        # distinct wallets that failed a route since its last success
+        self._route_failures: Dict[str, Set[str]] = {}
+        self._route_eligible_at: Dict[str, float] = {}
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # a connection must not be used across fork(), so a forked warmup process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            directory = os.path.dirname(self.file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._connection = sqlite3.connect(self.file_name, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS wallets (address TEXT PRIMARY KEY, failures INTEGER NOT NULL, "
+                "eligible_at REAL NOT NULL, quarantined INTEGER NOT NULL, reasons TEXT NOT NULL, routes TEXT NOT NULL)"
+            )
+        return self._connection
+
+    @property
+    def wallets(self) -> Dict[str, WalletState]:
+        if self._wallets is None:
+            self._wallets = {
+                address: WalletState(
+                    failures=failures,
+                    eligible_at=eligible_at,
+                    quarantined=bool(quarantined),
+                    reasons=json.loads(reasons),
+                    routes=json.loads(routes)
+                )
+                for address, failures, eligible_at, quarantined, reasons, routes in self.connection.execute(
+                    "SELECT address, failures, eligible_at, quarantined, reasons, routes FROM wallets"
+                )
+            }
+        return self._wallets
+
+    def _save(self, address: str) -> None:
+        state = self.wallets.get(address)
+
+        with self.connection:
+            if state is None:
+                self.connection.execute("DELETE FROM wallets WHERE address = ?", (address,))
+                return
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO wallets VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    address, state.failures, state.eligible_at, int(state.quarantined),
+                    json.dumps(state.reasons), json.dumps(state.routes)
+                )
+            )
+
+    def get_quarantined(self) -> Dict[str, WalletState]:
+        return {address: state for address, state in self.wallets.items() if state.quarantined}
+
+    def get_excluded(self) -> Set[str]:
+        """Addresses that must not be picked now: quarantined and backing off wallets."""
+        now = time.time()
+        return {address for address, state in self.wallets.items() if state.quarantined or state.eligible_at > now}
+
+    def get_wait_time(self, addresses: Set[str]) -> float | None:
+        """Seconds until the first of ``addresses`` becomes eligible again, None if all of them are quarantined."""
+        eligible_at = [
+            self.wallets[address].eligible_at for address in addresses
+            if address in self.wallets and not self.wallets[address].quarantined
+        ]
+        return max(min(eligible_at) - time.time(), 0) if eligible_at else None
+
+    def _get_route_eligible_at(self, address: str, route: Route) -> float:
+        key = _route_key(route)
+        state = self.wallets.get(address)
+        wallet_route = state.routes.get(key, {}) if state else {}
+        return max(wallet_route.get("eligible_at", 0.0), self._route_eligible_at.get(key, 0.0))
+
+    def is_route_eligible(self, address: str, route: Route) -> bool:
+        return self._get_route_eligible_at(address, route) <= time.time()
+
+    def get_random_route(self, item: DataItem, route_weight: Callable[[Route], float]) -> Route | None:
+        """Random route of the wallet among the routes that are not backing off, None if there is none."""
+        routes = [ROUTES[route_id] for route_id in item.active_route_ids]
+
+        if not any(self.is_route_eligible(item.address, route) for route in routes):
+            return None
+
+        return item.get_random_route(
+            route_weight=lambda route: route_weight(route) if self.is_route_eligible(item.address, route) else 0
+        )
+
+    def postpone(self, item: DataItem) -> None:
+        """Makes a wallet whose routes all back off eligible again when the first of them does."""
+        state = self.wallets.setdefault(item.address, WalletState())
+        state.eligible_at = min(self._get_route_eligible_at(item.address, ROUTES[route_id]) for route_id in item.active_route_ids)
+        self._save(item.address)
+
+    def record_success(self, address: str, route: Route) -> None:
+        self._route_failures.pop(_route_key(route), None)
+
+        if address in self.wallets:
+            del self.wallets[address]
+            self._save(address)
+
+    def record_failure(self, address: str, route: Route | None, reason: str, retry_soon: bool = True) -> None:
+        """``retry_soon`` is False for errors that would repeat right away (reverts, no funds), they get the longest backoff.
+
+        While a route fails for every wallet (dapp or bridge down) its failures only postpone the route
+        and don't count towards the quarantine of the wallet, unless the error is the wallet's own.
+        """
+        state = self.wallets.setdefault(address, WalletState())
+        state.reasons = (state.reasons + [f"{route.dapp} {route.action}: {reason}" if route else reason])[-FAILURE_REASONS_KEPT:]
+
+        if route is not None:
+            key = _route_key(route)
+
+            wallet_route = state.routes.setdefault(key, {"failures": 0, "eligible_at": 0.0})
+            wallet_route["failures"] += 1
+            wallet_route["eligible_at"] = time.time() + get_backoff(wallet_route["failures"])
+
+            failed_wallets = self._route_failures.setdefault(key, set())
+            failed_wallets.add(address)
+            route_failures = len(failed_wallets) - ROUTE_FAILURES_BEFORE_BACKOFF + 1
+
+            if route_failures > 0:
+                self._route_eligible_at[key] = time.time() + get_backoff(route_failures)
+                logger.warning(
+                    f"[Scheduler] {key} failed for {len(failed_wallets)} wallets in a row, postponed for everyone",
+                    send_to_tg=False
+                )
+
+                # reverts and missing funds are the wallet's own, they count even while the route is down
+                if retry_soon:
+                    self._save(address)
+                    return
+
+        state.failures += 1
+        state.eligible_at = time.time() + (get_backoff(state.failures) if retry_soon else FAILURE_BACKOFF_MAX)
+
+        if state.failures >= self.max_failures:
+            state.quarantined = True
+            logger.error(f"[Scheduler] {address} quarantined after {state.failures} failures: {'; '.join(state.reasons)}")
+        else:
+            logger.warning(
+                f"[Scheduler] {address} postponed for {state.eligible_at - time.time():.0f}s "
+                f"({state.failures} failures in a row: {reason})",
+                send_to_tg=False
+            )
+
+        self._save(address)
+
+    def release(self, addresses: List[str] | None = None) -> int:
+        """Releases the given (or all) quarantined wallets, returns their number."""
+        released = [address for address in self.get_quarantined() if addresses is None or address in addresses]
+
+        for address in released:
+            del self.wallets[address]
+            self._save(address)
+
+        return len(released)
+
+
+failure_scheduler = FailureScheduler()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import hashlib
+import multiprocessing
+import os
+import queue
+from typing import Dict, List
+
+from config import USE_MOBILE_PROXY, USE_OKX_PREFUNDING, WARMUP_PROCESSES
+from modules.database import Database
+from modules.storage import JsonStorage
+from modules.analytics import analytics_store
+from modules.prefunding import prefunder
+from modules.warmup import Warmup
+from sdk import logger
+from sdk.cassette import cassette
+from sdk.delay_planner import delay_planner
+from sdk.signer import signer
+from sdk.constants import SHARDS_DIR, SHARD_PROGRESS_INTERVAL
+from sdk.models.data_item import DataItem
+
+
+def get_shard_index(address: str, shards: int) -> int:
+    return int(hashlib.sha256(address.lower().encode()).hexdigest(), 16) % shards
+
+
+def _get_shard_path(shard_index: int) -> str:
+    return os.path.join(SHARDS_DIR, f"database_{shard_index}.json")
+
+
+def _run_shard(shard_index: int, progress_queue: multiprocessing.Queue) -> None:
+    database = Database.read_from_json(file_name=_get_shard_path(shard_index))
+
+    def on_progress(shard_database: Database) -> None:
+        progress_queue.put((shard_index, sum(item.get_tx_count() for item in shard_database.data)))
+
+    on_progress(database)
+
+    try:
+        asyncio.run(Warmup.execute_mode(
+            database=database,
+            on_progress=on_progress,
+            trace_file=os.path.join(SHARDS_DIR, f"trace_{shard_index}.json"),
+            # the withdrawals of all shards are sent by the parent process, so they are paced together
+            prefund=False
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        on_progress(database)
+        # multiprocessing joins the children of a worker on exit, the signing pool processes wait for a shutdown
+        signer.shutdown()
+
+
+class ShardedRunner:
+    """Runs Warmup in several processes, each with its own event loop and its own share of the wallets.
+
+    Wallets are assigned to shards by address hash, every shard is persisted in its own JSON file
+    while the run is in progress and the shards are merged back into the database at the end.
+    Shards left over from an interrupted run are merged before a new split.
+    """
+
+    @staticmethod
+    async def run(processes: int = WARMUP_PROCESSES) -> None:
+        # forked workers would write into (or replay from) the same cassette at once
+        if cassette.enabled:
+            logger.error("[Runner] CASSETTE_MODE works with a single process only, run the warmup from the menu (2)")
+            return
+
+        if USE_MOBILE_PROXY and processes > 1:
+            logger.warning("[Runner] Mobile proxies can't be shared between processes, using one process")
+            processes = 1
+
+        database = Database.read()
+        ShardedRunner._merge_shards(database=database)
+
+        if not database.data:
+            logger.success("[Runner] No wallets left")
+            return
+
+        if delay_planner.enabled:
+            processes = ShardedRunner._get_deadline_processes(database=database, processes=processes)
+
+        if USE_OKX_PREFUNDING:
+            await prefunder.submit(items=database.data)
+
+        ShardedRunner._split(database=database, processes=processes)
+
+        # the workers are forked, they must not inherit the SQLite connections and the signing pool opened above
+        analytics_store.close()
+        signer.shutdown()
+
+        progress_queue = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_run_shard, args=(shard_index, progress_queue), daemon=False)
+            for shard_index in range(processes)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        logger.info(f"[Runner] Started {processes} warmup processes for {len(database.data)} wallets")
+
+        try:
+            ShardedRunner._watch_progress(workers=workers, progress_queue=progress_queue)
+        except KeyboardInterrupt:
+            logger.warning("[Runner] Stopping warmup processes", send_to_tg=False)
+        finally:
+            for worker in workers:
+                worker.join(timeout=30)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+
+            ShardedRunner._merge_shards(database=database)
+
+        logger.success("[Runner] Warmup ended")
+
+    @staticmethod
+    def _get_deadline_processes(database: Database, processes: int) -> int:
+        required = delay_planner.get_required_workers(
+            remaining_actions=sum(item.get_tx_count() for item in database.data),
+            latency=analytics_store.get_mean_latency()
+        )
+
+        if required > processes:
+            logger.warning(
+                f"[Runner] {required} processes are needed to finish by the deadline with the usual delays, "
+                f"delays will be shortened for {processes}",
+                send_to_tg=False
+            )
+            return processes
+
+        return required
+
+    @staticmethod
+    def _split(database: Database, processes: int) -> None:
+        os.makedirs(SHARDS_DIR, exist_ok=True)
+
+        shards: List[List[DataItem]] = [[] for _ in range(processes)]
+        for item in database.data:
+            shards[get_shard_index(item.address, processes)].append(item)
+
+        for shard_index, items in enumerate(shards):
+            JsonStorage(file_name=_get_shard_path(shard_index)).save_all(items)
+
+    @staticmethod
+    def _watch_progress(workers: List[multiprocessing.Process], progress_queue: multiprocessing.Queue) -> None:
+        progress: Dict[int, int] = {}
+        last_reported = None
+
+        while any(worker.is_alive() for worker in workers) or not progress_queue.empty():
+            try:
+                shard_index, tx_left = progress_queue.get(timeout=SHARD_PROGRESS_INTERVAL)
+                progress[shard_index] = tx_left
+            except queue.Empty:
+                pass
+
+            total = sum(progress.values())
+            if progress and total != last_reported:
+                shards = ", ".join(f"#{index}: {tx_left}" for index, tx_left in sorted(progress.items()))
+                logger.info(f"[Runner] Transactions left: {total} ({shards})", send_to_tg=False)
+                last_reported = total
+
+    @staticmethod
+    def _merge_shards(database: Database) -> None:
+        shard_paths = sorted(glob.glob(os.path.join(SHARDS_DIR, "database_*.json")))
+
+        if not shard_paths:
+            return
+
+        # every wallet belongs to exactly one shard and finished wallets are deleted from it,
+        # so the union of the shards is the up-to-date database
+        database.data = [item for path in shard_paths for item in Database.read_from_json(file_name=path).data]
+        database.save_database()
+
+        for path in shard_paths:
+            os.remove(path)
+
+        logger.info(f"[Runner] Merged {len(shard_paths)} shards, {len(database.data)} wallets left")
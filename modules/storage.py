@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List
+
+from config import DATABASE_BACKEND
+from sdk import logger
+from sdk.constants import DATABASE_PATH, SQLITE_DATABASE_PATH
+from sdk.models.data_item import DataItem
+
+STATE_COLUMNS = (
+    "warmup_started",
+    "warmup_finished",
+    "okx_withdrawn",
+    "polygon_from_usdc_swapped",
+    "from_polygon_ageur_bridged",
+    "to_polygon_ageur_bridged",
+    "polygon_to_usdc_swapped",
+    "sent_to_okx",
+)
+
+COUNT_COLUMNS = (
+    "tx_count",
+    "stargate_tx_count",
+    "core_bridge_tx_count",
+)
+
+JSON_COLUMNS = (
+    "merkly_tx_count",
+    "chain_with_funds",
+    "step_checkpoints",
+)
+
+
+class JsonStorage:
+    """Keeps the whole database as one JSON array, every save rewrites the file."""
+
+    def __init__(self, file_name: str = DATABASE_PATH) -> None:
+        self.file_name = file_name
+
+    def load(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.file_name, "r") as json_file:
+                return json.load(json_file)
+        except Exception as e:
+            logger.error(f"[Database] {e}")
+            return []
+
+    def save_all(self, items: List[DataItem]) -> None:
+        temp_file_name = f"{self.file_name}.tmp"
+
+        with open(temp_file_name, "w") as json_file:
+            json.dump([item.to_dict() for item in items], json_file, indent=4)
+
+        os.replace(temp_file_name, self.file_name)
+
+    def save_item(self, item: DataItem, items: List[DataItem]) -> None:
+        self.save_all(items)
+
+    def delete_item(self, item: DataItem, items: List[DataItem]) -> None:
+        self.save_all(items)
+
+    def query_addresses(self, **criteria) -> List[str] | None:
+        return None
+
+
+class SqliteStorage:
+    """One row per wallet in SQLite (WAL mode) with indexed state flags and remaining tx counts."""
+
+    def __init__(self, file_name: str = SQLITE_DATABASE_PATH) -> None:
+        self.file_name = file_name
+        self.connection = sqlite3.connect(file_name)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = ", ".join(
+            [f"{column} INTEGER NOT NULL DEFAULT 0" for column in STATE_COLUMNS + COUNT_COLUMNS]
+            + [f"{column} TEXT" for column in JSON_COLUMNS]
+        )
+
+        with self.connection:
+            existing_store = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'wallets'"
+            ).fetchone() is not None
+
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS wallets ("
+                f"address TEXT PRIMARY KEY, private_key TEXT NOT NULL, proxy TEXT, deposit_address TEXT, {columns})"
+            )
+            self._add_missing_columns()
+
+            for column in STATE_COLUMNS + COUNT_COLUMNS:
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_wallets_{column} ON wallets ({column})")
+
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+            # stores created before the meta table have been filled already, even if they are empty now
+            if existing_store:
+                self._set_imported()
+
+    def _add_missing_columns(self) -> None:
+        existing = {row["name"] for row in self.connection.execute("PRAGMA table_info(wallets)")}
+
+        for column in STATE_COLUMNS + COUNT_COLUMNS:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE wallets ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+        for column in JSON_COLUMNS:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE wallets ADD COLUMN {column} TEXT")
+
+    def _set_imported(self) -> None:
+        self.connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('imported', '1')")
+
+    @property
+    def imported(self) -> bool:
+        """Whether the store has been filled once, by the JSON import or a full save."""
+        return self.connection.execute("SELECT 1 FROM meta WHERE key = 'imported'").fetchone() is not None
+
+    @staticmethod
+    def _to_row(item: DataItem) -> Dict[str, Any]:
+        row = item.to_dict()
+        row["tx_count"] = item.get_tx_count()
+
+        for column in JSON_COLUMNS:
+            row[column] = json.dumps(row[column])
+
+        return row
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        item = dict(row)
+        item.pop("tx_count")
+
+        for column in STATE_COLUMNS:
+            item[column] = bool(item[column])
+
+        for column in JSON_COLUMNS:
+            item[column] = json.loads(item[column]) if item[column] is not None else None
+
+        return item
+
+    def load(self) -> List[Dict[str, Any]]:
+        return [self._from_row(row) for row in self.connection.execute("SELECT * FROM wallets ORDER BY rowid")]
+
+    def _upsert(self, items: List[DataItem]) -> None:
+        rows = [self._to_row(item) for item in items]
+
+        if not rows:
+            return
+
+        columns = list(rows[0])
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column != "address")
+
+        self.connection.executemany(
+            f"INSERT INTO wallets ({', '.join(columns)}) VALUES ({', '.join(':' + column for column in columns)}) "
+            f"ON CONFLICT(address) DO UPDATE SET {updates}",
+            rows
+        )
+
+    def save_all(self, items: List[DataItem]) -> None:
+        with self.connection:
+            self._upsert(items)
+
+            addresses = [item.address for item in items]
+            self.connection.execute(
+                f"DELETE FROM wallets WHERE address NOT IN ({', '.join('?' * len(addresses))})",
+                addresses
+            )
+            self._set_imported()
+
+    def save_item(self, item: DataItem, items: List[DataItem] | None = None) -> None:
+        with self.connection:
+            self._upsert([item])
+
+    def delete_item(self, item: DataItem, items: List[DataItem] | None = None) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM wallets WHERE address = ?", (item.address,))
+
+    def query_addresses(self, **criteria) -> List[str] | None:
+        if any(key not in STATE_COLUMNS + COUNT_COLUMNS + ("address", "proxy", "deposit_address") for key in criteria):
+            return None
+
+        where = " AND ".join(f"{key} = :{key}" for key in criteria) or "1"
+        rows = self.connection.execute(f"SELECT address FROM wallets WHERE {where} ORDER BY rowid", criteria)
+        return [row["address"] for row in rows]
+
+    def import_json(self, file_name: str = DATABASE_PATH) -> List[Dict[str, Any]]:
+        items = JsonStorage(file_name=file_name).load()
+
+        if items:
+            logger.info(f"[Database] Importing {len(items)} wallets from {file_name} into {self.file_name}")
+
+        return items
+
+
+def get_storage() -> JsonStorage | SqliteStorage:
+    if DATABASE_BACKEND == "sqlite":
+        directory = os.path.dirname(SQLITE_DATABASE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SqliteStorage()
+    return JsonStorage()
@@ -1,4 +1,9 @@
+from __future__ import annotations
+
+import asyncio
 import random
+import time
+from typing import Callable
 
 from config import (
     USE_MOBILE_PROXY,
@@ -7,83 +12,270 @@ from config import (
     OKX_API_KEY,
     OKX_API_SECRET,
     OKX_API_PASSWORD,
-    STARGATE_TX_COUNT,
-    MERKLY_TX_COUNT, CORE_TX_COUNT
+    USE_OKX_PREFUNDING
 )
+from modules.analytics import analytics_store, track_action
+from modules.balance_snapshots import BalanceSnapshots
 from modules.database import Database
-from sdk import Client, logger, OKX
+from modules.prefunding import prefunder
+from modules.scheduler import failure_scheduler
+from sdk import Client, logger
+from sdk.balance_ledger import balance_ledger
 from sdk.dapps import Stargate, CoreBridge
+from sdk.constants import (
+    MIN_ROUTE_WEIGHT,
+    NATIVE_TOKEN_CONTRACT_ADDRESS,
+    PREFUNDING_POLL_INTERVAL,
+    RETRY_POLICIES,
+    TRACE_PATH
+)
 from sdk.dapps.merkly import Merkly
+from sdk.delay_planner import delay_planner
 from sdk.models.chain import NAMES_TO_CHAINS
 from sdk.models.data_item import DataItem
+from sdk.models.route import ROUTES, Route
+from sdk.rate_limiter import rate_limiter
+from sdk.retry import CircuitOpenError, ErrorKind, classify_error, get_backoff_delay, retry_engine
+from sdk.tracer import tracer
 from sdk.utils import change_ip
 
 
 class Warmup:
     @staticmethod
-    async def execute_mode():
-        database = Database.read_from_json()
+    async def execute_mode(
+            database: Database | None = None,
+            on_progress: Callable[[Database], None] | None = None,
+            trace_file: str = TRACE_PATH,
+            prefund: bool = USE_OKX_PREFUNDING
+    ):
+        """``prefund`` sends the OKX withdrawals of all wallets before the warmup, wallets wait for the withdrawals
+        sent by an earlier run (or by the sharded runner) either way."""
+        if database is None:
+            database = Database.read()
+
+        if not await Warmup.validate_routes(database=database):
+            return
+
+        if prefund:
+            await prefunder.submit(items=database.data)
+        else:
+            prefunder.load()
+
+        Warmup.seed_balances(database=database)
+
+        if delay_planner.enabled:
+            delay_planner.start(
+                remaining_actions=sum(item.get_tx_count() for item in database.data),
+                latency=analytics_store.get_mean_latency()
+            )
+
+        prefunding_watch = asyncio.create_task(prefunder.watch(items=database.data))
+
+        try:
+            await Warmup._execute_loop(database=database, on_progress=on_progress)
+        finally:
+            prefunding_watch.cancel()
+            tracer.export(file_name=trace_file)
+
+    @staticmethod
+    def seed_balances(database: Database) -> None:
+        """Starts the balance ledger from the native balances of the last balance checker run (or prefunding)."""
+        snapshots = BalanceSnapshots.load()
+        now = time.time()
+
+        for item in database.data:
+            for chain_name, snapshot in snapshots.wallets.get(item.address, {}).items():
+                if chain_name not in NAMES_TO_CHAINS:
+                    continue
+
+                balance_ledger.seed(
+                    address=item.address,
+                    chain_id=NAMES_TO_CHAINS[chain_name].chain_id,
+                    token_address=NATIVE_TOKEN_CONTRACT_ADDRESS,
+                    balance=snapshot["balance"],
+                    block=snapshot["block"],
+                    age=now - snapshot["checked_at"]
+                )
+
+    @staticmethod
+    async def validate_routes(database: Database) -> bool:
+        """Checks the routes that still have transactions left before any wallet is touched."""
+        route_ids = sorted({route_id for item in database.data for route_id in item.active_route_ids})
+        problems = await ROUTES.validate(route_ids)
+
+        for problem in problems:
+            logger.error(f"[Warmup] {problem}", send_to_tg=False)
+
+        if problems:
+            logger.error("[Warmup] Fix the routes in config.py or set their tx-range to [0, 0]")
+
+        return not problems
+
+    @staticmethod
+    async def _execute_loop(database: Database, on_progress: Callable[[Database], None] | None = None):
+        quarantined = len(failure_scheduler.get_quarantined())
+        if quarantined:
+            logger.warning(f"[Warmup] {quarantined} wallets are quarantined and will be skipped", send_to_tg=False)
 
         while True:
+            data_item = None
+            route = None
+
             try:
                 if USE_MOBILE_PROXY:
                     await change_ip()
 
-                data_item, index = database.get_random_data_item()
+                # wallets waiting for an OKX withdrawal are taken once the funds arrive
+                data_item, index = database.get_random_data_item(
+                    exclude=failure_scheduler.get_excluded() | prefunder.get_pending_addresses()
+                )
 
                 if not data_item:
-                    break
+                    addresses = {item.address for item in database.data}
+                    wait_time = failure_scheduler.get_wait_time(addresses)
+
+                    if addresses.intersection(prefunder.get_pending_addresses()):
+                        wait_time = min(wait_time, PREFUNDING_POLL_INTERVAL) if wait_time is not None else PREFUNDING_POLL_INTERVAL
+
+                    if wait_time is None:
+                        break
 
+                    logger.info(f"[Warmup] All wallets left are postponed, waiting {wait_time:.0f}s", send_to_tg=False)
+                    await asyncio.sleep(wait_time)
+                    continue
+
+                tracer.set_wallet(data_item.address)
                 client = Client(private_key=data_item.private_key, proxy=data_item.proxy)
 
                 logger.info("", send_to_tg=False)
-                logger.debug(f"[Warmup] Wallet: {data_item.address}")
+                logger.debug(f"[Warmup] Wallet: {data_item.address}", wallet=data_item.address)
                 logger.info(f"[Warmup] Transactions left for this wallet: {data_item.get_tx_count()}", send_to_tg=False)
 
-                action, dapp = data_item.get_random_warmup_action()
+                # an interrupted swap-and-bridge is finished first, so the swapped tokens don't stay on the wallet
+                route = data_item.get_resumable_route() or failure_scheduler.get_random_route(
+                    item=data_item, route_weight=Warmup.get_route_weight
+                )
 
-                if not action:
+                if not route:
                     if database.delete_item_if_finished(data_item=data_item):
                         logger.warning(f"[Warmup] No actions left for this wallet")
-                        database.save_database()
+                    else:
+                        # every route left for this wallet is postponed after failures
+                        failure_scheduler.postpone(item=data_item)
                     continue
 
-                if await Warmup.execute_warmup_action(
+                log_context = logger.contextualize(
+                    wallet=data_item.address, chain=route.src_chain.name, action=route.action, dapp=route.dapp
+                )
+
+                with log_context, tracer.span("warmup.action", chain=route.src_chain.name, route=route.action, dapp=route.dapp), \
+                        delay_planner.action(), track_action(route=route, data_item=data_item) as metrics:
+                    result = await Warmup.execute_warmup_action(
                         item=data_item,
-                        action=action,
-                        dapp=dapp,
-                        client=client
-                ):
-                    database.delete_item_if_finished(data_item=data_item)
-                    database.save_database()
+                        route=route,
+                        client=client,
+                        save_item=database.save_item
+                    )
+                    metrics.success = bool(result)
+
+                if not result:
+                    if await Warmup.wait_for_outage(route=route):
+                        continue
+
+                    failure_scheduler.record_failure(
+                        address=data_item.address,
+                        route=route,
+                        reason=metrics.error or "action failed",
+                        retry_soon=metrics.error_class is None or RETRY_POLICIES[metrics.error_class]["tries"] > 1
+                    )
+                    continue
+
+                failure_scheduler.record_success(address=data_item.address, route=route)
+                delay_planner.action_completed()
+
+                if not database.delete_item_if_finished(data_item=data_item):
+                    database.save_item(data_item=data_item)
+
+                if on_progress:
+                    on_progress(database)
             except Exception as ex:
-                logger.exception(f"[Warmup] Error occurred: {ex}")
+                await Warmup.handle_error(error=ex, data_item=data_item, route=route)
+
+        quarantined = {item.address for item in database.data}.intersection(failure_scheduler.get_quarantined())
+        if quarantined:
+            logger.warning(f"[Warmup] {len(quarantined)} wallets with actions left are quarantined")
         logger.success(f"[Warmup] Warmup ended")
 
+    @staticmethod
+    async def handle_error(error: Exception, data_item: DataItem | None, route: Route | None):
+        kind = classify_error(error)
+
+        if isinstance(error, CircuitOpenError):
+            logger.warning(f"[Warmup] {error}", send_to_tg=False)
+            await asyncio.sleep(error.retry_after)
+            return
+
+        logger.exception(f"[Warmup] Error occurred ({kind.value}): {error}")
+
+        if route is not None and await Warmup.wait_for_outage(route=route):
+            return
+
+        if data_item is None:
+            await asyncio.sleep(get_backoff_delay(kind=ErrorKind.TRANSIENT, attempt=0))
+            return
+
+        # permanent errors would fail the same way again, so the wallet gets the longest backoff
+        failure_scheduler.record_failure(
+            address=data_item.address,
+            route=route,
+            reason=f"{kind.value}: {error}",
+            retry_soon=RETRY_POLICIES[kind.value]["tries"] > 1
+        )
+
+    @staticmethod
+    async def wait_for_outage(route: Route) -> bool:
+        """Waits out an open circuit breaker of the route's RPC, failures during an outage aren't the wallet's fault."""
+        breaker = retry_engine.get_breaker(route.src_chain.rpc) if route.src_chain.rpc else None
+
+        if breaker is None or not breaker.is_open:
+            return False
+
+        delay = max(breaker.retry_after(), get_backoff_delay(kind=ErrorKind.TRANSIENT, attempt=0))
+        logger.warning(
+            f"[Warmup] {route.src_chain.name} RPC is failing, the failure isn't counted, waiting {delay:.0f}s",
+            send_to_tg=False
+        )
+        await asyncio.sleep(delay)
+        return True
+
     @staticmethod
     async def execute_warmup_action(
             item: DataItem,
-            action: str,
-            dapp,
-            client: Client
+            route: Route,
+            client: Client,
+            save_item: Callable[[DataItem], None] | None = None
     ):
-        chains = action.split('-')
-        src_chain = NAMES_TO_CHAINS[chains[0]]
-        dst_chain = NAMES_TO_CHAINS[chains[1]]
+        src_chain = route.src_chain
+        dst_chain = route.dst_chain
+        action = route.action
 
-        amount_to_use = await Warmup.uniform_bridge_amount(dapp=dapp, action=action)
-        src_chain_balance = (await client.get_native_balance(chain=src_chain)) / 10 ** 18
+        amount_to_use = Warmup.uniform_bridge_amount(route=route)
 
         if not amount_to_use:
             return None
 
         if src_chain.name in USE_OKX_WITHDRAW and USE_OKX_WITHDRAW[src_chain.name]["use"]:
+            with tracer.span("warmup.balance_check", chain=src_chain.name):
+                src_chain_balance = (await client.get_native_balance(chain=src_chain)) / 10 ** 18
+
             if USE_OKX_WITHDRAW[src_chain.name]["min-balance"] >= src_chain_balance:
                 amount_to_withdraw = round(
                     random.uniform(*USE_OKX_WITHDRAW[src_chain.name]["amount"]),
                     ROUND_TO
                 )
 
+                from sdk.okx import OKX
+
                 okx = OKX(
                     api_key=OKX_API_KEY,
                     secret=OKX_API_SECRET,
@@ -91,46 +283,42 @@ class Warmup:
                     client=client
                 )
 
-                await okx.withdraw(
-                    amount_to_withdraw=amount_to_withdraw,
-                    token=src_chain.coin_symbol,
-                    chain=src_chain
-                )
+                with tracer.span("warmup.okx_withdraw", chain=src_chain.name):
+                    await okx.withdraw(
+                        amount_to_withdraw=amount_to_withdraw,
+                        token=src_chain.coin_symbol,
+                        chain=src_chain
+                    )
 
-        if dapp == Merkly:
+        if route.dapp == "Merkly":
             dapp = Merkly(client=client, chain=src_chain)
             result = await dapp.bridge(src_chain=src_chain, dst_chain=dst_chain, amount=amount_to_use)
 
-        elif dapp == Stargate:
-            dapp = Stargate(client=client)
-            result = await dapp.swap_and_bridge(amount=amount_to_use)
-
         else:
-            dapp = CoreBridge(client=client)
+            dapp = Stargate(client=client) if route.dapp == "Stargate" else CoreBridge(client=client)
+
+            def on_step(step: str, tx_hash: str, amount: float) -> None:
+                item.save_step(action=action, dapp=route.dapp, step=step, tx_hash=tx_hash, amount=amount)
+                if save_item:
+                    save_item(item)
 
-            result = await dapp.swap_and_bridge(amount=amount_to_use)
+            result = await dapp.swap_and_bridge(
+                amount=amount_to_use,
+                completed_steps=item.get_completed_steps(action),
+                on_step=on_step
+            )
 
         if result:
-            item.decrease_action_count(action=action, dapp=dapp.name)
+            # the bridged funds arrive on the destination chain outside of our receipts
+            balance_ledger.invalidate(address=item.address, chain_id=dst_chain.chain_id)
+            item.decrease_route_count(route_id=route.route_id)
             return True
 
     @staticmethod
-    async def uniform_bridge_amount(dapp, action: str):
-        if dapp == Stargate:
-            return round(
-                random.uniform(*STARGATE_TX_COUNT[action]['amount-range']),
-                ROUND_TO
-            )
-        elif dapp == CoreBridge:
-            return round(
-                random.uniform(*CORE_TX_COUNT[action]['amount-range']),
-                ROUND_TO
-            )
-        elif dapp == Merkly:
-            chains = action.split('-')
-            return round(
-                random.uniform(*MERKLY_TX_COUNT[chains[0]][chains[1]]['amount-range']),
-                ROUND_TO
-            )
-        else:
-            return None
+    def get_route_weight(route: Route) -> float:
+        # routes whose source RPC still has request budget are preferred, but none is starved completely
+        return MIN_ROUTE_WEIGHT + rate_limiter.spare_capacity(route.src_chain.rpc)
+
+    @staticmethod
+    def uniform_bridge_amount(route: Route) -> float:
+        return round(random.uniform(*route.amount_range), ROUND_TO)
@@ -0,0 +1,260 @@
+"""Micro-benchmarks of the in-process hot paths on synthetic databases.
+
+Database and DataItem operations run on 1k, 10k and 100k wallets, per-call operations (Token conversions,
+dapp calldata encoding, signing) are measured once. Results are compared with the saved baseline and
+the script exits with status 1 if anything got slower than the threshold.
+
+Usage (from the project root):
+    python scripts/benchmark.py [--sizes 1000 10000] [--filter database] [--threshold 0.2] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT_DIR, "data", "benchmark_baseline.json")
+
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+# number of calls of the benchmarks that don't depend on the database size
+PER_CALL_COUNT = 1_000
+SIGNING_COUNT = 20
+
+
+def make_database(size: int, file_name: str):
+    from modules.database import Database
+    from modules.storage import JsonStorage
+    from sdk.models.data_item import DataItem
+    from sdk.signer import signer
+
+    random.seed(size)
+    items = []
+
+    for index in range(1, size + 1):
+        private_key = f"0x{index:064x}"
+        address = f"0x{index:040x}"
+
+        # deriving 100k addresses takes minutes without coincurve, the benchmarks measure reads with a warm cache
+        signer._addresses[private_key] = address
+
+        items.append(DataItem(
+            private_key=private_key,
+            address=address,
+            proxy=f"user:pass@10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}:8080",
+            deposit_address=f"0x{index + size:040x}",
+            merkly_tx_count=Database.get_randomized_merkly_tx_counts(),
+            stargate_tx_count=Database.get_randomized_tx_count("Polygon-Kava", "Stargate"),
+            core_bridge_tx_count=Database.get_randomized_tx_count("BSC-Core", "CoreBridge"),
+        ))
+
+    database = Database(data=items, storage=JsonStorage(file_name=file_name))
+    database.save_database()
+    return database
+
+
+def scaling_benchmarks(size: int, directory: str) -> Dict[str, Callable[[], object]]:
+    from modules.database import Database
+
+    file_name = os.path.join(directory, f"database_{size}.json")
+    database = make_database(size=size, file_name=file_name)
+    last_item = database.data[-1]
+
+    def get_random_routes():
+        for item in database.data:
+            item.get_random_route()
+
+    def get_random_weighted_routes():
+        for item in database.data:
+            item.get_random_route(route_weight=lambda route: route.amount_range[1])
+
+    def get_tx_counts():
+        for item in database.data:
+            item.get_tx_count()
+
+    return {
+        "Database.read_from_json": lambda: Database.read_from_json(file_name=file_name),
+        "Database.save_database": database.save_database,
+        "Database.get_item_index_by_data": lambda: database.get_item_index_by_data(last_item),
+        "Database.query_items_by_criteria": lambda: database.query_items_by_criteria(warmup_started=False),
+        "DataItem.get_random_route": get_random_routes,
+        "DataItem.get_random_route(weighted)": get_random_weighted_routes,
+        "DataItem.get_tx_count": get_tx_counts,
+    }
+
+
+def per_call_benchmarks() -> Dict[str, Tuple[Callable[[], object], int]]:
+    from eth_abi.packed import encode_packed
+    from web3 import Web3
+
+    from sdk.constants import (
+        CORE_BRIDGE_ABI,
+        CORE_BRIDGE_CONTRACT_ADDRESS,
+        MERKLY_CHAIN_TO_REFUEL_CONTRACT_ADDRESS,
+        MERKLY_REFUEL_ABI,
+        STG_TOKEN_ABI,
+        STG_TOKEN_CONTRACT_ADDRESS,
+        ZERO_ADDRESS
+    )
+    from sdk.models.chain import Kava, Polygon
+    from sdk.models.token import ETH_Token, USDT_Token
+    from sdk.signer import _derive_address, _sign_transaction
+
+    w3 = Web3()
+    private_key = f"0x{1:064x}"
+    address = _derive_address(private_key)
+
+    merkly = w3.eth.contract(address=MERKLY_CHAIN_TO_REFUEL_CONTRACT_ADDRESS[Polygon.name], abi=MERKLY_REFUEL_ABI)
+    stargate = w3.eth.contract(address=STG_TOKEN_CONTRACT_ADDRESS, abi=STG_TOKEN_ABI)
+    core_bridge = w3.eth.contract(address=CORE_BRIDGE_CONTRACT_ADDRESS, abi=CORE_BRIDGE_ABI)
+
+    merkly_params = w3.to_hex(encode_packed(["uint16", "uint", "uint", "address"], [2, 250000, 10 ** 15, address]))
+    stargate_params = w3.to_hex(encode_packed(["uint16", "uint"], [1, 85000]))
+
+    tx_params = {
+        "chainId": Polygon.chain_id,
+        "nonce": 1,
+        "to": STG_TOKEN_CONTRACT_ADDRESS,
+        "value": 10 ** 15,
+        "gas": 300_000,
+        "maxFeePerGas": 100 * 10 ** 9,
+        "maxPriorityFeePerGas": 30 * 10 ** 9,
+        "data": "0x" + "ab" * 196,
+    }
+
+    def repeat(func: Callable[[], object], count: int = PER_CALL_COUNT):
+        def run():
+            for _ in range(count):
+                func()
+
+        return run, count
+
+    return {
+        "Token.to_wei": repeat(lambda: ETH_Token.to_wei(0.0123456)),
+        "Token.from_wei": repeat(lambda: ETH_Token.from_wei(12345600000000000)),
+        "Merkly.encodeABI(bridgeGas)": repeat(
+            lambda: merkly.encodeABI("bridgeGas", args=(Kava.lz_chain_id, address, merkly_params))
+        ),
+        "Stargate.encodeABI(sendTokens)": repeat(
+            lambda: stargate.encodeABI("sendTokens", args=(Kava.lz_chain_id, address, 10 ** 18, ZERO_ADDRESS, stargate_params))
+        ),
+        "CoreBridge.encodeABI(bridge)": repeat(
+            lambda: core_bridge.encodeABI("bridge", args=(
+                USDT_Token.chain_to_contract_mapping["BSC"], 10 ** 18, address, [address, ZERO_ADDRESS], "0x"
+            ))
+        ),
+        "signer.sign_transaction": repeat(lambda: _sign_transaction(tx_params, private_key), count=SIGNING_COUNT),
+        "signer.derive_address": repeat(lambda: _derive_address(private_key), count=SIGNING_COUNT),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Best of ``repeat`` runs, in seconds."""
+    best = float("inf")
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    return best
+
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.2f} us"
+
+
+def run(sizes: List[int], repeat: int, name_filter: str | None) -> Dict[str, float]:
+    results = {}
+
+    def selected(name: str) -> bool:
+        return not name_filter or name_filter.lower() in name.lower()
+
+    for name, (func, count) in per_call_benchmarks().items():
+        if selected(name):
+            results[name] = measure(func, repeat=repeat) / count
+            print(f"{name:<40} {'per call':>10} {format_time(results[name]):>12}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            benchmarks = {name: func for name, func in scaling_benchmarks(size, directory).items() if selected(name)}
+
+            for name, func in benchmarks.items():
+                key = f"{name}[{size}]"
+                results[key] = measure(func, repeat=repeat)
+                print(f"{name:<40} {size:>10} {format_time(results[key]):>12}")
+
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[str]:
+    regressions = []
+
+    for key, seconds in results.items():
+        if key not in baseline:
+            continue
+
+        change = seconds / baseline[key] - 1
+        if change > threshold:
+            regressions.append(
+                f"{key}: {format_time(baseline[key])} -> {format_time(seconds)} ({change:+.0%})"
+            )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of synthetic wallets")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every benchmark, the best one is kept")
+    parser.add_argument("--filter", help="run only the benchmarks whose name contains this text")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(sizes=args.sizes, repeat=args.repeat, name_filter=args.filter)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as file:
+                baseline = json.load(file)["results"]
+
+        with open(args.baseline, "w") as file:
+            json.dump({"python": platform.python_version(), "results": {**baseline, **results}}, file, indent=4)
+
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline in {args.baseline}, save one with --save-baseline")
+        return
+
+    with open(args.baseline) as file:
+        regressions = compare(results=results, baseline=json.load(file)["results"], threshold=args.threshold)
+
+    if regressions:
+        print(f"\nSlower than the baseline by more than {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
+
+    print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Import-time summary of the project entry points, based on ``python -X importtime``.
+
+Usage (from the project root):
+    python scripts/import_time_report.py [module ...] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "main",
+    "modules.database",
+    "modules.balance_checker",
+    "modules.warmup",
+]
+
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not import {module}:\n{result.stderr}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, cumulative_time, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_time), int(cumulative_time)))
+
+    return imports
+
+
+def report(module: str, top: int) -> None:
+    imports = measure(module)
+    total = next(cumulative for name, _, cumulative in reversed(imports) if name == module)
+
+    packages: Dict[str, int] = {}
+    for name, _, cumulative in imports:
+        package = name.split(".")[0]
+        if name != module and package not in ("modules", "sdk", "config", "site"):
+            packages[package] = max(packages.get(package, 0), cumulative)
+
+    print(f"{module}: {total / 1000:.0f} ms")
+    for package, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"    {package:<24} {cumulative / 1000:>8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=5, help="number of the slowest third-party packages to show")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        report(module=module, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Prints the log records of one wallet from data/logs/log.jsonl and its rotated archives.
+
+Usage (from the project root):
+    python scripts/wallet_log.py <address> [--json]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+from typing import Iterator
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS_DIR = os.path.join(ROOT_DIR, "data", "logs")
+
+
+def read_records() -> Iterator[dict]:
+    # rotated files are named log.<date>.jsonl.gz, sorting by name keeps them in chronological order
+    paths = sorted(glob.glob(os.path.join(LOGS_DIR, "log.*.jsonl.gz"))) + [os.path.join(LOGS_DIR, "log.jsonl")]
+
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+
+        opener = gzip.open if path.endswith(".gz") else open
+
+        with opener(path, "rt") as file:
+            for line in file:
+                yield json.loads(line)["record"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("address")
+    parser.add_argument("--json", action="store_true", help="print the records as JSON lines")
+    args = parser.parse_args()
+
+    address = args.address.lower()
+
+    for record in read_records():
+        extra = record["extra"]
+
+        if extra.get("wallet", "").lower() != address:
+            continue
+
+        if args.json:
+            print(json.dumps(record))
+            continue
+
+        fields = " ".join(f"{key}={value}" for key, value in extra.items() if key != "wallet")
+        print(f"{record['time']['repr'][:19]} {record['level']['name']:<8} {record['message']} {fields}".rstrip())
+
+
+if __name__ == "__main__":
+    main()
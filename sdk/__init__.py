@@ -1,3 +1,12 @@
 from .logger import logger
-from sdk.client import Client
-from .okx import OKX
+
+
+def __getattr__(name: str):
+    # web3 and ccxt take seconds to import, so Client and OKX are loaded only when they are used
+    if name == "Client":
+        from sdk.client import Client
+        return Client
+    if name == "OKX":
+        from sdk.okx import OKX
+        return OKX
+    raise AttributeError(f"module 'sdk' has no attribute '{name}'")
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Dict
+
+from config import APPROVE_STRATEGY, APPROVE_MULTIPLIER
+from sdk.constants import MAX_UINT256
+
+
+class AllowanceCache:
+    """Locally tracked allowances per (owner, token, spender, chain).
+
+    Values come from on-chain reads and from our own confirmed approvals, and are
+    decreased by every amount we hand over to the spender, so the cache never
+    claims more allowance than there actually is.
+    """
+
+    def __init__(self) -> None:
+        self._allowances: Dict[tuple[str, str, str, int], int] = {}
+
+    @staticmethod
+    def _key(owner: str, token_address: str, spender: str, chain_id: int) -> tuple[str, str, str, int]:
+        return owner.lower(), token_address.lower(), spender.lower(), chain_id
+
+    def get(self, owner: str, token_address: str, spender: str, chain_id: int) -> int | None:
+        return self._allowances.get(self._key(owner, token_address, spender, chain_id))
+
+    def set(self, owner: str, token_address: str, spender: str, chain_id: int, value: int) -> None:
+        self._allowances[self._key(owner, token_address, spender, chain_id)] = value
+
+    def consume(self, owner: str, token_address: str, spender: str, chain_id: int, value: int) -> None:
+        key = self._key(owner, token_address, spender, chain_id)
+        allowance = self._allowances.get(key)
+
+        if allowance is None or allowance == MAX_UINT256:
+            return
+
+        self._allowances[key] = max(allowance - value, 0)
+
+    def invalidate(self, owner: str, token_address: str, spender: str, chain_id: int) -> None:
+        self._allowances.pop(self._key(owner, token_address, spender, chain_id), None)
+
+
+def get_approve_value(value: int) -> int:
+    if APPROVE_STRATEGY == "unlimited":
+        return MAX_UINT256
+    if APPROVE_STRATEGY == "multiple":
+        return min(int(value * APPROVE_MULTIPLIER), MAX_UINT256)
+    return value
+
+
+allowance_cache = AllowanceCache()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+from hexbytes import HexBytes
+
+from config import BALANCE_LEDGER_RECONCILE_INTERVAL, BALANCE_LEDGER_RECONCILE_TXS
+from sdk.constants import NATIVE_TOKEN_CONTRACT_ADDRESS, TRANSFER_EVENT_TOPIC
+from sdk.logger import logger
+
+
+@dataclass
+class LedgerEntry:
+    balance: int
+    block: int
+    read_at: float
+    # own transactions applied since the balance was read from the chain
+    transactions: int = 0
+
+
+class BalanceLedger:
+    """Raw balances per (address, chain, token), kept up to date locally from the receipts of our own transactions.
+
+    An entry is seeded by a balance read (or a balance checker snapshot), then every receipt of the wallet
+    subtracts the sent value and the paid fee from the native balance and applies its Transfer logs to the
+    token balances. Transfers from others are not in our receipts, so an entry is served until it is
+    ``reconcile_interval`` seconds old or has absorbed ``reconcile_txs`` transactions, the next read then
+    reconciles it with the chain. Reads from before the last applied receipt are ignored, so a lagging
+    RPC node can not bring back a balance from before the transaction.
+    """
+
+    def __init__(
+            self,
+            reconcile_interval: float = BALANCE_LEDGER_RECONCILE_INTERVAL,
+            reconcile_txs: int = BALANCE_LEDGER_RECONCILE_TXS
+    ) -> None:
+        self.reconcile_interval = reconcile_interval
+        self.reconcile_txs = reconcile_txs
+        self._entries: Dict[tuple[str, int, str], LedgerEntry] = {}
+        self._min_blocks: Dict[tuple[str, int], int] = {}
+        # sent transactions whose receipts are not applied yet, per (address, chain)
+        self._pending: Dict[tuple[str, int], int] = {}
+
+    def get(self, address: str, chain_id: int, token_address: str) -> int | None:
+        address = address.lower()
+        entry = self._entries.get((address, chain_id, token_address.lower()))
+
+        if entry is None or self._pending.get((address, chain_id)):
+            return None
+
+        if time.monotonic() - entry.read_at > self.reconcile_interval or entry.transactions >= self.reconcile_txs:
+            return None
+
+        return entry.balance
+
+    def set(self, address: str, chain_id: int, token_address: str, balance: int, block: int) -> None:
+        """Stores a balance read from the chain, reconciling the local entry with it."""
+        address = address.lower()
+
+        if block < self._min_blocks.get((address, chain_id), 0):
+            return
+
+        key = (address, chain_id, token_address.lower())
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.transactions and balance != entry.balance:
+            # a positive drift is usually an incoming transfer, a negative one a fee the receipt doesn't show
+            logger.debug(
+                f"[Ledger] {address} on chain {chain_id}: {token_address} drifted by {balance - entry.balance} "
+                f"after {entry.transactions} transactions",
+                send_to_tg=False
+            )
+
+        self._entries[key] = LedgerEntry(balance=balance, block=block, read_at=time.monotonic())
+
+    def seed(self, address: str, chain_id: int, token_address: str, balance: int, block: int, age: float) -> None:
+        """Adds a balance read ``age`` seconds ago elsewhere (e.g. by the balance checker), unless one is known."""
+        key = (address.lower(), chain_id, token_address.lower())
+
+        if key not in self._entries and age < self.reconcile_interval:
+            self._entries[key] = LedgerEntry(balance=balance, block=block, read_at=time.monotonic() - age)
+
+    def transaction_sent(self, address: str, chain_id: int) -> None:
+        key = (address.lower(), chain_id)
+        self._pending[key] = self._pending.get(key, 0) + 1
+
+    def apply_receipt(self, address: str, chain_id: int, receipt: dict, tx_params: dict | None) -> None:
+        address = address.lower()
+        key = (address, chain_id)
+
+        self._pending[key] = max(self._pending.get(key, 0) - 1, 0)
+        self._min_blocks[key] = max(self._min_blocks.get(key, 0), receipt["blockNumber"])
+
+        if tx_params is None:
+            self.invalidate(address=address, chain_id=chain_id)
+            return
+
+        native = self._entries.get((address, chain_id, NATIVE_TOKEN_CONTRACT_ADDRESS.lower()))
+
+        if native is not None:
+            gas_price = receipt.get("effectiveGasPrice") or tx_params.get("gasPrice") or tx_params["maxFeePerGas"]
+            native.balance -= receipt["gasUsed"] * gas_price
+
+            # the value of a reverted transaction stays with the sender, a cancellation sends it to itself
+            if receipt.get("status") == 1 and tx_params["to"].lower() != address:
+                native.balance -= tx_params.get("value") or 0
+
+        address_bytes = HexBytes(address)
+
+        for log in receipt.get("logs", []):
+            topics = [HexBytes(topic) for topic in log["topics"]]
+
+            if len(topics) != 3 or topics[0] != HexBytes(TRANSFER_EVENT_TOPIC):
+                continue
+
+            entry = self._entries.get((address, chain_id, log["address"].lower()))
+
+            if entry is None:
+                continue
+
+            amount = int.from_bytes(HexBytes(log["data"]), "big")
+
+            if topics[1][-20:] == address_bytes:
+                entry.balance -= amount
+            if topics[2][-20:] == address_bytes:
+                entry.balance += amount
+
+        for (entry_address, entry_chain_id, _), entry in self._entries.items():
+            if entry_address == address and entry_chain_id == chain_id:
+                entry.transactions += 1
+                entry.block = max(entry.block, receipt["blockNumber"])
+
+    def invalidate(self, address: str, chain_id: int) -> None:
+        """Drops the wallet's entries on the chain, for transactions whose outcome is unknown and incoming funds."""
+        address = address.lower()
+
+        for key in [key for key in self._entries if key[0] == address and key[1] == chain_id]:
+            del self._entries[key]
+
+        self._pending.pop((address, chain_id), None)
+
+
+balance_ledger = BalanceLedger()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Dict
+
+from sdk.constants import (
+    BLOCK_TIME_SAMPLE_SIZE,
+    DEFAULT_BLOCK_TIME,
+    MIN_RECEIPT_TIMEOUT,
+    MAX_RECEIPT_TIMEOUT
+)
+from sdk.logger import logger
+
+
+class BlockTimeTracker:
+    """Average block time per chain, measured once from the timestamps of the last blocks."""
+
+    def __init__(self, sample_size: int = BLOCK_TIME_SAMPLE_SIZE) -> None:
+        self.sample_size = sample_size
+        self._block_times: Dict[int, float] = {}
+
+    async def get_block_time(self, w3, chain_id: int) -> float:
+        if chain_id not in self._block_times:
+            try:
+                latest = await w3.eth.get_block("latest")
+                first = await w3.eth.get_block(max(latest["number"] - self.sample_size, 0))
+                blocks = latest["number"] - first["number"]
+
+                block_time = (latest["timestamp"] - first["timestamp"]) / blocks if blocks else DEFAULT_BLOCK_TIME
+                self._block_times[chain_id] = max(block_time, 0.1)
+            except Exception as e:
+                logger.warning(f"[Client] Could not measure block time of chain {chain_id}: {e}", send_to_tg=False)
+                return DEFAULT_BLOCK_TIME
+
+        return self._block_times[chain_id]
+
+    async def get_timeout(self, w3, chain_id: int, blocks: int) -> float:
+        """Seconds in which ``blocks`` blocks are expected, clamped to sane bounds."""
+        block_time = await self.get_block_time(w3=w3, chain_id=chain_id)
+        return min(max(block_time * blocks, MIN_RECEIPT_TIMEOUT), MAX_RECEIPT_TIMEOUT)
+
+
+block_times = BlockTimeTracker()
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+from config import CASSETTE_MODE, CASSETTE_REPLAY_TIMING
+from sdk.constants import CASSETTE_PATH, CASSETTE_VERSION
+from sdk.logger import logger
+
+
+class CassetteMissError(Exception):
+    def __init__(self, kind: str, endpoint: str, method: str, *args: object) -> None:
+        self.message = f"No recorded {kind} response for {method} on {endpoint}"
+        super().__init__(self.message, *args)
+
+
+class ReplayedError(Exception):
+    """Base class of the errors raised while replaying, they get the class name of the recorded error."""
+
+
+class Cassette:
+    """Records every JSON-RPC, 0x and OKX exchange of a run and serves them back without network.
+
+    In "record" mode requests go to the network and every response (or error) is written to a gzipped
+    JSONL cassette together with its latency. In "replay" mode responses are taken from the cassette:
+    identical requests get their answers in the recorded order, requests that changed (e.g. a signed
+    transaction with another deadline) fall back to the next answer of the same method.
+    The random seed is stored in the cassette, so replayed runs pick the same wallets, routes and amounts.
+    """
+
+    def __init__(
+            self,
+            mode: str | None = CASSETTE_MODE,
+            file_name: str = CASSETTE_PATH,
+            replay_timing: bool = CASSETTE_REPLAY_TIMING
+    ) -> None:
+        if mode not in (None, "record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.mode = mode
+        self.file_name = file_name
+        self.replay_timing = replay_timing
+        self.calls: Counter = Counter()
+        self.misses = 0
+        self.recorded_calls = 0
+        self._exact: Dict[str, Deque[dict]] = {}
+        self._by_method: Dict[str, Deque[dict]] = {}
+        self._file = None
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+
+        if mode == "record":
+            self._start_recording()
+        elif mode == "replay":
+            self._load()
+
+        if mode is not None:
+            atexit.register(self.close)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _start_recording(self) -> None:
+        directory = os.path.dirname(self.file_name)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        seed = random.randrange(2 ** 32)
+        random.seed(seed)
+
+        self._file = gzip.open(self.file_name, "wt")
+        self._write({"version": CASSETTE_VERSION, "seed": seed, "started_at": time.time()})
+
+    def _load(self) -> None:
+        with gzip.open(self.file_name, "rt") as file:
+            header = json.loads(next(file))
+
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version {header.get('version')} in {self.file_name}")
+
+            for line in file:
+                exchange = json.loads(line)
+                exchange["used"] = False
+                self._exact.setdefault(exchange["key"], deque()).append(exchange)
+                self._by_method.setdefault(_method_key(exchange), deque()).append(exchange)
+                self.recorded_calls += 1
+
+        random.seed(header["seed"])
+        logger.info(f"[Cassette] Replaying {self.recorded_calls} exchanges from {self.file_name}", send_to_tg=False)
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":"), default=_to_json) + "\n")
+
+    async def exchange(
+            self,
+            kind: str,
+            endpoint: str,
+            method: str,
+            params: Any,
+            send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Sends the request with ``send()``, records its result or replays it, depending on the mode."""
+        if not self.enabled:
+            return await send()
+
+        self.calls[f"{kind} {method}"] += 1
+        key = _request_key(kind, endpoint, method, params)
+
+        if self.replaying:
+            exchange = self._take(key=key, kind=kind, endpoint=endpoint, method=method)
+            if self.replay_timing:
+                await asyncio.sleep(exchange["elapsed"])
+            return _replay_result(exchange)
+
+        started = time.perf_counter()
+        try:
+            result = await send()
+        except Exception as e:
+            self._record(kind, endpoint, method, key, started, error=e)
+            raise
+
+        self._record(kind, endpoint, method, key, started, result=result)
+        return result
+
+    def _record(
+            self,
+            kind: str,
+            endpoint: str,
+            method: str,
+            key: str,
+            started: float,
+            result: Any = None,
+            error: Exception | None = None
+    ) -> None:
+        record = {
+            "kind": kind,
+            "endpoint": endpoint,
+            "method": method,
+            "key": key,
+            "offset": round(started - self._started, 6),
+            "elapsed": round(time.perf_counter() - started, 6),
+        }
+
+        if error is None:
+            record["result"] = result
+        else:
+            record["error"] = {
+                "class": type(error).__name__,
+                "message": str(error),
+                "status": getattr(error, "status", None),
+            }
+
+        try:
+            self._write(record)
+        except Exception as e:
+            logger.error(f"[Cassette] Could not record {kind} {method}: {e}", send_to_tg=False)
+
+    def _take(self, key: str, kind: str, endpoint: str, method: str) -> dict:
+        exchanges = self._exact.get(key)
+
+        while exchanges and exchanges[0]["used"]:
+            exchanges.popleft()
+
+        if not exchanges:
+            self.misses += 1
+            exchanges = self._by_method.get(_method_key({"kind": kind, "endpoint": endpoint, "method": method}))
+
+            while exchanges and exchanges[0]["used"]:
+                exchanges.popleft()
+
+            if not exchanges:
+                raise CassetteMissError(kind=kind, endpoint=endpoint, method=method)
+
+        exchange = exchanges.popleft()
+        exchange["used"] = True
+        return exchange
+
+    def close(self) -> None:
+        if not self.enabled:
+            return
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        total_calls = sum(self.calls.values())
+        summary = f"{total_calls} calls, CPU time {time.process_time() - self._cpu_started:.2f}s"
+
+        if self.replaying:
+            summary += f", {self.recorded_calls} recorded, {self.misses} served out of order"
+            logger.info(f"[Cassette] Replay finished: {summary}", send_to_tg=False)
+        else:
+            logger.info(f"[Cassette] Recorded to {self.file_name}: {summary}", send_to_tg=False)
+
+        for call, count in self.calls.most_common():
+            logger.debug(f"[Cassette] {call}: {count}", send_to_tg=False)
+
+        self.mode = None
+
+    def web3_middleware(self, endpoint: str):
+        """Web3 middleware that records or replays the raw JSON-RPC responses, injected at the innermost layer."""
+        async def cassette_middleware(make_request, w3):
+            async def middleware(method, params):
+                return await self.exchange("rpc", endpoint, method, params, lambda: make_request(method, params))
+
+            return middleware
+
+        return cassette_middleware
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _request_key(kind: str, endpoint: str, method: str, params: Any) -> str:
+    request = json.dumps([kind, endpoint, method, params], sort_keys=True, separators=(",", ":"), default=_to_json)
+    return hashlib.sha1(request.encode()).hexdigest()
+
+
+def _method_key(exchange: dict) -> str:
+    return f"{exchange['kind']} {exchange['endpoint']} {exchange['method']}"
+
+
+def _replay_result(exchange: dict) -> Any:
+    error = exchange.get("error")
+
+    if error is None:
+        return exchange["result"]
+
+    # same class name and status as the recorded error, so the retry engine classifies it the same way
+    error_class = type(error["class"], (ReplayedError,), {})
+    replayed_error = error_class(error["message"])
+
+    if error["status"] is not None:
+        replayed_error.status = error["status"]
+
+    raise replayed_error
+
+
+cassette = Cassette()
@@ -1,18 +1,38 @@
 from __future__ import annotations
 
+import asyncio
 import random
+import time
 from typing import Dict
 
 from aiohttp_proxy import ProxyConnector
 from web3 import AsyncWeb3, Web3
 from web3.contract import Contract
-from web3.middleware import geth_poa_middleware
+from web3.exceptions import TransactionNotFound
 
-from config import AFTER_APPROVE_DELAY_RANGE
+from config import AFTER_APPROVE_DELAY_RANGE, USE_TX_SIMULATION, STUCK_TX_BLOCKS, MAX_TX_REPLACEMENTS, CANCEL_STUCK_TX
 from sdk import logger
-from sdk.constants import GAS_MULTIPLIER, RETRIES, APPROVE_VALUE_RANGE
+from sdk.allowance import allowance_cache, get_approve_value
+from sdk.balance_ledger import balance_ledger
+from sdk.block_time import block_times
+from sdk.cassette import cassette
+from sdk.gas_cache import gas_cache
+from sdk.metrics import get_action_metrics, record_action_error
+from sdk.constants import (
+    GAS_MULTIPLIER,
+    RETRIES,
+    APPROVE_VALUE_RANGE,
+    NATIVE_TOKEN_CONTRACT_ADDRESS,
+    RECEIPT_POLL_BLOCKS,
+    TX_FEE_BUMP_MULTIPLIER
+)
 from sdk.models.chain import Chain, EthMainnet
 from sdk.models.token import ETH_Token
+from sdk.rate_limiter import rate_limiter
+from sdk.retry import ErrorKind, record_error, retry_engine
+from sdk.signer import signer
+from sdk.simulation import TransactionSimulationError, classify_revert, decode_revert_reason
+from sdk.tracer import tracer
 from sdk.utils import retry_on_fail, sleep_pause
 
 
@@ -22,10 +42,10 @@ class Client:
         self.chain = chain
         self.proxy = proxy
         self.w3 = self.init_web3(chain=chain)
-        self.address = AsyncWeb3.to_checksum_address(
-            value=self.w3.eth.account.from_key(private_key=private_key).address
-        )
+        self.address = signer.derive_address(private_key=private_key)
         self.tokens = [ETH_Token]
+        self.sent_transactions = 0
+        self.pending_transactions: Dict[str, dict] = {}
 
     def __str__(self) -> str:
         return self.address
@@ -40,7 +60,13 @@ class Client:
             if not chain.rpc:
                 raise NoRPCEndpointSpecifiedError
 
-            return AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(endpoint_uri=chain.rpc, request_kwargs=request_kwargs))
+            w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(endpoint_uri=chain.rpc, request_kwargs=request_kwargs))
+            w3.middleware_onion.inject(cassette.web3_middleware(chain.rpc), name="cassette", layer=0)
+
+            # replayed responses don't reach the RPC, so they are served without waiting for the rate limit
+            if not cassette.replaying:
+                w3.middleware_onion.add(rate_limiter.middleware(chain.rpc), name="rate_limiter")
+            return w3
 
         except NoRPCEndpointSpecifiedError as e:
             logger.error(e)
@@ -57,19 +83,116 @@ class Client:
             from_: str = None,
             value: int = None,
     ):
-        tx_params = await self._get_tx_params(
-            to=to, data=data, from_=from_, value=value
-        )
+        if USE_TX_SIMULATION:
+            with tracer.span("client.simulate", chain=self.chain.name):
+                await self.simulate_transaction(to=to, data=data, from_=from_, value=value)
 
-        tx_params["gas"] = await self._get_gas_estimate(tx_params=tx_params)
+        try:
+            # nonce errors are retried from scratch, so every attempt is signed with a fresh nonce
+            tx_hash = await retry_engine.run(
+                self._sign_and_send, to=to, data=data, from_=from_, value=value, endpoint=self.chain.rpc
+            )
 
-        sign = self.w3.eth.account.sign_transaction(tx_params, self.private_key)
+            self.sent_transactions += 1
+            balance_ledger.transaction_sent(address=self.address, chain_id=self.chain.chain_id)
+            return tx_hash
 
-        try:
-            return await self.w3.eth.send_raw_transaction(sign.rawTransaction)
+        except Exception as e:
+            # the transaction might have reached the node anyway
+            balance_ledger.invalidate(address=self.address, chain_id=self.chain.chain_id)
+            logger.error(f"Error while sending transaction: {e}", chain=self.chain.name)
+
+    async def _sign_and_send(self, to: str, data: str = None, from_: str = None, value: int = None):
+        with tracer.span("client.tx_params", chain=self.chain.name):
+            tx_params = await self._get_tx_params(
+                to=to, data=data, from_=from_, value=value
+            )
+
+        tx_params["gas"] = gas_cache.get(chain_id=self.chain.chain_id, to=tx_params["to"], data=tx_params.get("data"))
+
+        if tx_params["gas"] is None:
+            with tracer.span("client.gas_estimate", chain=self.chain.name):
+                tx_params["gas"] = await self._get_gas_estimate(tx_params=tx_params)
+
+        return await self._send_signed(tx_params=tx_params)
+
+    async def _send_signed(self, tx_params: dict):
+        with tracer.span("client.sign", chain=self.chain.name):
+            raw_transaction = await signer.sign_transaction(tx_params=tx_params, private_key=self.private_key)
+
+        with tracer.span("client.send", chain=self.chain.name):
+            try:
+                tx_hash = await self.w3.eth.send_raw_transaction(raw_transaction)
+            except Exception as e:
+                # the node already has this very transaction (e.g. a retried send whose response was lost)
+                if "already known" not in str(e).lower():
+                    raise
+
+                tx_hash = Web3.keccak(raw_transaction)
+                logger.info(f"Transaction is already known to the node: {self.w3.to_hex(tx_hash)}", send_to_tg=False)
 
+        # kept until the receipt arrives, so the transaction can be re-sent with the same nonce
+        self.pending_transactions[self.w3.to_hex(tx_hash)] = tx_params
+        return tx_hash
+
+    async def replace_transaction(self, tx_hash, cancel: bool = False):
+        """Re-sends a pending transaction with the same nonce and bumped fees.
+
+        With ``cancel`` the replacement is an empty transfer to the own address.
+        """
+        tx_params = dict(self.pending_transactions[self.w3.to_hex(tx_hash)])
+
+        if cancel:
+            tx_params.pop("data", None)
+            tx_params.update(to=self.address, value=0, gas=21000)
+
+        gas_price = await self.w3.eth.gas_price
+
+        if "maxFeePerGas" in tx_params:
+            tx_params["maxPriorityFeePerGas"] = int(tx_params["maxPriorityFeePerGas"] * TX_FEE_BUMP_MULTIPLIER)
+            tx_params["maxFeePerGas"] = max(
+                int(tx_params["maxFeePerGas"] * TX_FEE_BUMP_MULTIPLIER),
+                gas_price + tx_params["maxPriorityFeePerGas"]
+            )
+        else:
+            tx_params["gasPrice"] = max(int(tx_params["gasPrice"] * TX_FEE_BUMP_MULTIPLIER), gas_price)
+
+        with tracer.span("client.replace", chain=self.chain.name, cancel=cancel):
+            return await self._send_signed(tx_params=tx_params)
+
+    async def cancel_transaction(self, tx_hash):
+        return await self.replace_transaction(tx_hash=tx_hash, cancel=True)
+
+    async def simulate_transaction(
+            self,
+            to: str,
+            data: str = None,
+            from_: str = None,
+            value: int = None,
+    ) -> None:
+        call_params = {
+            "from": self.w3.to_checksum_address(from_ or self.address),
+            "to": self.w3.to_checksum_address(to),
+        }
+
+        if data:
+            call_params["data"] = data
+
+        if value:
+            call_params["value"] = value
+
+        try:
+            await self.w3.eth.call(call_params, "pending")
         except Exception as e:
-            logger.error(f"Error while sending transaction: {e}")
+            reason = decode_revert_reason(e)
+
+            if reason is None:
+                logger.warning(f"Transaction simulation skipped: {e}", send_to_tg=False)
+                return
+
+            error = TransactionSimulationError(reason=reason, kind=classify_revert(reason))
+            record_error(error)
+            raise error
 
     async def _get_gas_estimate(
             self, tx_params: dict, gas_multiplier: float = GAS_MULTIPLIER
@@ -103,12 +226,8 @@ class Client:
         if self.chain.chain_id == 56:
             tx_params["gasPrice"] = Web3.to_wei(1.5, "gwei")
         elif self.chain.eip_1559:
-            w3 = Web3(provider=Web3.HTTPProvider(endpoint_uri=self.chain.rpc))
-            w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-            last_block = w3.eth.get_block("latest")
-            max_priority_fee_per_gas = Client.get_max_priority_fee_per_gas(w3=w3, block=last_block)
-            base_fee = int(last_block["baseFeePerGas"] * GAS_MULTIPLIER)
-            max_fee_per_gas = base_fee + max_priority_fee_per_gas
+            base_fee, max_priority_fee_per_gas = await self.get_eip1559_fees()
+            max_fee_per_gas = int(base_fee * GAS_MULTIPLIER) + max_priority_fee_per_gas
             tx_params["maxPriorityFeePerGas"] = max_priority_fee_per_gas
             tx_params["maxFeePerGas"] = max_fee_per_gas
         else:
@@ -116,48 +235,165 @@ class Client:
 
         return tx_params
 
+    @tracer.trace("client.receipt_wait")
     async def verify_tx(self, tx_hash: str) -> bool:
         try:
-            response = await self.w3.eth.wait_for_transaction_receipt(
-                tx_hash, timeout=600
-            )
+            response, cancelled = await self.wait_for_receipt(tx_hash=tx_hash)
+
+            if response is None:
+                balance_ledger.invalidate(address=self.address, chain_id=self.chain.chain_id)
+                record_action_error(ErrorKind.TRANSIENT.value, f"transaction {self.w3.to_hex(tx_hash)} was not mined")
+                logger.error(
+                    f"Transaction was not mined: {self.chain.explorer}tx/{self.w3.to_hex(tx_hash)}",
+                    chain=self.chain.name,
+                    tx_hash=self.w3.to_hex(tx_hash)
+                )
+                return False
+
+            if cancelled:
+                record_action_error(ErrorKind.TRANSIENT.value, f"stuck transaction {self.w3.to_hex(tx_hash)} was cancelled")
+                logger.error(
+                    f"Transaction was cancelled: {self.chain.explorer}tx/{self.w3.to_hex(response['transactionHash'])}",
+                    chain=self.chain.name,
+                    tx_hash=self.w3.to_hex(response["transactionHash"])
+                )
+                return False
 
             if "status" in response and response["status"] == 1:
                 logger.success(
-                    f"Transaction was successful: {self.chain.explorer}tx/{self.w3.to_hex(tx_hash)}"
+                    f"Transaction was successful: {self.chain.explorer}tx/{self.w3.to_hex(response['transactionHash'])}",
+                    chain=self.chain.name,
+                    tx_hash=self.w3.to_hex(response["transactionHash"])
                 )
                 return True
             else:
+                record_action_error(
+                    ErrorKind.PERMANENT.value, f"transaction {self.w3.to_hex(response['transactionHash'])} reverted"
+                )
                 logger.error(
-                    f"Transaction failed: {self.chain.explorer}tx/{self.w3.to_hex(tx_hash)}"
+                    f"Transaction failed: {self.chain.explorer}tx/{self.w3.to_hex(response['transactionHash'])}",
+                    chain=self.chain.name,
+                    tx_hash=self.w3.to_hex(response["transactionHash"])
                 )
                 return False
 
         except Exception as e:
+            record_error(e)
             logger.error(f"Unexpected error in verify_tx function: {e}")
             return False
 
-    @staticmethod
-    def get_max_priority_fee_per_gas(w3: Web3, block: dict) -> int:
-        block_number = block["number"]
-        latest_block_transaction_count = w3.eth.get_block_transaction_count(block_number)
-        max_priority_fee_per_gas_list = []
-        for i in range(latest_block_transaction_count):
-            try:
-                transaction = w3.eth.get_transaction_by_block(block_number, i)
-                if "maxPriorityFeePerGas" in transaction:
-                    max_priority_fee_per_gas_list.append(transaction["maxPriorityFeePerGas"])
-            except Exception:
-                continue
-
-        if not max_priority_fee_per_gas_list:
-            max_priority_fee_per_gas = w3.eth.max_priority_fee
+    async def wait_for_receipt(self, tx_hash) -> tuple[dict | None, bool]:
+        """Waits for the transaction or one of its replacements to be mined.
+
+        A transaction that is not mined within ``STUCK_TX_BLOCKS`` blocks is sped up with a fee bump,
+        after ``MAX_TX_REPLACEMENTS`` bumps it is cancelled. Returns the receipt (or ``None``)
+        and whether the mined transaction is the cancellation.
+        """
+        stuck_timeout = await block_times.get_timeout(w3=self.w3, chain_id=self.chain.chain_id, blocks=STUCK_TX_BLOCKS)
+        poll_latency = await block_times.get_block_time(w3=self.w3, chain_id=self.chain.chain_id) * RECEIPT_POLL_BLOCKS
+
+        tx_hashes = [tx_hash]
+        cancel_hash = None
+        actions = ["speed-up"] * MAX_TX_REPLACEMENTS + (["cancel"] if CANCEL_STUCK_TX else [])
+
+        try:
+            for action in actions + [None]:
+                receipt = await self._poll_receipts(tx_hashes=tx_hashes, timeout=stuck_timeout, poll_latency=poll_latency)
+
+                if receipt is not None:
+                    cancelled = self.w3.to_hex(receipt["transactionHash"]) == cancel_hash
+
+                    if not cancelled:
+                        self._learn_gas_limit(receipt=receipt)
+
+                    tx_params = self.pending_transactions.get(self.w3.to_hex(receipt["transactionHash"]))
+
+                    balance_ledger.apply_receipt(
+                        address=self.address,
+                        chain_id=self.chain.chain_id,
+                        receipt=receipt,
+                        tx_params=tx_params
+                    )
+
+                    metrics = get_action_metrics()
+                    if metrics is not None:
+                        metrics.add_receipt(receipt, value=0 if cancelled or tx_params is None else tx_params.get("value") or 0)
+
+                    return receipt, cancelled
+
+                if action is None:
+                    break
+
+                logger.warning(
+                    f"Transaction is not mined after {STUCK_TX_BLOCKS} blocks, sending a {action} replacement",
+                    send_to_tg=False
+                )
+
+                try:
+                    replacement_hash = await self.replace_transaction(tx_hash=tx_hashes[-1], cancel=action == "cancel")
+                except Exception as e:
+                    # "nonce too low" means that one of the sent transactions has just been mined
+                    logger.warning(f"Could not replace transaction: {e}", send_to_tg=False)
+                    continue
+
+                tx_hashes.append(replacement_hash)
+
+                if action == "cancel":
+                    cancel_hash = self.w3.to_hex(replacement_hash)
+
+            return None, False
+        finally:
+            for sent_hash in tx_hashes:
+                self.pending_transactions.pop(self.w3.to_hex(sent_hash), None)
+
+    def _learn_gas_limit(self, receipt: dict) -> None:
+        tx_params = self.pending_transactions.get(self.w3.to_hex(receipt["transactionHash"]))
+
+        if tx_params is None:
+            return
+
+        gas_key = dict(chain_id=self.chain.chain_id, to=tx_params["to"], data=tx_params.get("data"))
+
+        if receipt.get("status") == 1:
+            gas_cache.record(**gas_key, gas_used=receipt["gasUsed"])
         else:
-            max_priority_fee_per_gas_list.sort()
-            max_priority_fee_per_gas = max_priority_fee_per_gas_list[len(max_priority_fee_per_gas_list) // 2]
-        return max_priority_fee_per_gas
+            # the limit might have been too low, the next send of this function is estimated live
+            gas_cache.invalidate(**gas_key)
+
+    async def _poll_receipts(self, tx_hashes: list, timeout: float, poll_latency: float) -> dict | None:
+        deadline = time.monotonic() + timeout
+
+        while True:
+            for tx_hash in tx_hashes:
+                try:
+                    return await self.w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    pass
+
+            if time.monotonic() >= deadline:
+                return None
+
+            await asyncio.sleep(poll_latency)
+
+    async def get_eip1559_fees(self) -> tuple[int, int]:
+        """Base fee and median priority fee of the latest block, from one rate-limited ``eth_feeHistory`` call."""
+        try:
+            fee_history = await self.w3.eth.fee_history(1, "latest", [50])
+            base_fee = fee_history["baseFeePerGas"][0]
+            max_priority_fee_per_gas = fee_history["reward"][0][0] if fee_history.get("reward") else 0
+        except Exception as e:
+            # nodes without eth_feeHistory
+            logger.warning(f"Could not get fee history: {e}", send_to_tg=False)
+            base_fee = await self.w3.eth.gas_price
+            max_priority_fee_per_gas = 0
+
+        if not max_priority_fee_per_gas:
+            max_priority_fee_per_gas = await self.w3.eth.max_priority_fee
+
+        return base_fee, max_priority_fee_per_gas
 
     @retry_on_fail(tries=RETRIES)
+    @tracer.trace("client.allowance")
     async def get_allowance(
             self, token_contract: Contract, spender: str, owner: str = None
     ) -> float:
@@ -167,16 +403,23 @@ class Client:
         return await token_contract.functions.allowance(owner, spender).call()
 
     @retry_on_fail(tries=RETRIES)
-    async def get_native_balance(self, chain: Chain):
+    async def get_native_balance(self, chain: Chain, use_cache: bool = True):
+        if use_cache:
+            balance = balance_ledger.get(self.address, chain.chain_id, NATIVE_TOKEN_CONTRACT_ADDRESS)
+            if balance is not None:
+                return balance
+
         w3 = self.init_web3(chain=chain)
 
-        try:
-            return await w3.eth.get_balance(self.address)
-        except Exception as e:
-            logger.exception(f"[CLIENT] Could not get balance of: {self.address}: {e}")
-            return None
+        # errors are left to the retry engine, which retries transient ones and re-raises the rest
+        with tracer.span("client.native_balance", chain=chain.name):
+            block, balance = await asyncio.gather(w3.eth.block_number, w3.eth.get_balance(self.address))
+
+        balance_ledger.set(self.address, chain.chain_id, NATIVE_TOKEN_CONTRACT_ADDRESS, balance=balance, block=block)
+        return balance
 
     @retry_on_fail(tries=RETRIES)
+    @tracer.trace("client.approve")
     async def approve(
             self, spender: str, token, value: int = None, ignore_allowance: bool = False
     ) -> bool:
@@ -186,51 +429,73 @@ class Client:
         if token.is_native_token_mapping[self.chain.name]:
             return True
 
-        token_contract = self.w3.eth.contract(address=token.chain_to_contract_mapping[self.chain.name], abi=token.abi)
-        allowance = await self.get_allowance(token_contract=token_contract, spender=spender)
+        token_address = token.chain_to_contract_mapping[self.chain.name]
+        allowance_key = dict(owner=self.address, token_address=token_address, spender=spender, chain_id=self.chain.chain_id)
 
         if self.chain.chain_id == 56 and token.symbol == "USDT":
             decimals = 18
         else:
             decimals = token.decimals
 
+        if not ignore_allowance:
+            cached_allowance = allowance_cache.get(**allowance_key)
+
+            if cached_allowance is not None and cached_allowance >= value:
+                logger.info(f"Cached allowance is sufficient: {cached_allowance / pow(10, decimals)} {token.symbol}")
+                allowance_cache.consume(**allowance_key, value=value)
+                return True
+
+        token_contract = self.w3.eth.contract(address=token_address, abi=token.abi)
+        allowance = await self.get_allowance(token_contract=token_contract, spender=spender)
+        allowance_cache.set(**allowance_key, value=allowance)
+
         if not ignore_allowance:
             if allowance >= value:
                 logger.warning(
                     f"Allowance is greater than approve value: {allowance / pow(10, decimals)} >= {value / pow(10, decimals)}")
+                allowance_cache.consume(**allowance_key, value=value)
                 return True
 
-        logger.info(f"Approving {value / pow(10, decimals)} {token.symbol} for spender: {spender}")
+        approve_value = get_approve_value(value=value)
+
+        logger.info(f"Approving {approve_value / pow(10, decimals)} {token.symbol} for spender: {spender}")
 
-        response = token_contract.encodeABI("approve", args=(spender, value))
+        response = token_contract.encodeABI("approve", args=(spender, approve_value))
         tx_hash = await self.send_transaction(token_contract.address, data=response)
 
         if await self.verify_tx(tx_hash=tx_hash):
+            allowance_cache.set(**allowance_key, value=approve_value)
+            allowance_cache.consume(**allowance_key, value=value)
             await sleep_pause(delay_range=AFTER_APPROVE_DELAY_RANGE)
             return True
 
+        allowance_cache.invalidate(**allowance_key)
         logger.error("Error in approve transaction")
         return False
 
     @retry_on_fail(tries=RETRIES)
-    async def get_token_balance(self, token):
+    async def get_token_balance(self, token, use_cache: bool = True):
         if token.is_native_token_mapping[self.chain.name]:
-            balance = await self.get_native_balance()
+            balance = await self.get_native_balance(chain=self.chain, use_cache=use_cache)
 
             if not balance:
                 return None
 
             return float(self.w3.from_wei(balance, "ether"))
 
-        token_contract = self.w3.eth.contract(
-            address=token.chain_to_contract_mapping[self.chain.name], abi=token.abi
-        )
+        token_address = token.chain_to_contract_mapping[self.chain.name]
+        balance = balance_ledger.get(self.address, self.chain.chain_id, token_address) if use_cache else None
 
-        try:
-            balance = await token_contract.functions.balanceOf(self.address).call()
-        except Exception as e:
-            logger.error(f"Exception in get_token_balance function: {e}")
-            return None
+        if balance is None:
+            token_contract = self.w3.eth.contract(address=token_address, abi=token.abi)
+
+            with tracer.span("client.token_balance", chain=self.chain.name, token=token.symbol):
+                block, balance = await asyncio.gather(
+                    self.w3.eth.block_number,
+                    token_contract.functions.balanceOf(self.address).call()
+                )
+
+            balance_ledger.set(self.address, self.chain.chain_id, token_address, balance=balance, block=block)
 
         if token.symbol == "USDT" and self.chain.chain_id == 56:
             balance_from_wei = balance / 10 ** 18
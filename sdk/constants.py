@@ -23,12 +23,123 @@ DEPOSIT_ADDRESSES_PATH = "data/deposit_addresses.txt"
 # path to a database.json file
 DATABASE_PATH = "data/database.json"
 
+# path to a SQLite database file (DATABASE_BACKEND = "sqlite")
+SQLITE_DATABASE_PATH = "data/database.sqlite3"
+
+# directory for per-process database shards of the multi-process warmup
+SHARDS_DIR = "data/shards"
+
+# how often (in seconds) the multi-process warmup checks the progress of its shards
+SHARD_PROGRESS_INTERVAL = 5
+
+# directory for the CSV/JSONL output of the balance checker
+BALANCE_CHECKER_DIR = "data/balances"
+
+# number of wallets whose nonces and balances are read in one JSON-RPC batch
+BALANCE_CHECKER_BATCH_SIZE = 50
+
+# native balances, nonces and blocks from the previous balance checker runs
+BALANCE_SNAPSHOTS_PATH = "data/balance_snapshots.json"
+
+# number of the last checked wallets shown in the live balance checker table
+BALANCE_CHECKER_LIVE_ROWS = 20
+
+# path to a Chrome trace-event file
+TRACE_PATH = "data/trace.json"
+
+# per-action durations, fees and outcomes of the warmup
+ANALYTICS_PATH = "data/analytics.sqlite3"
+
+# failure counters, backoff and quarantine of wallets
+SCHEDULER_PATH = "data/scheduler.sqlite3"
+
+# withdrawals sent by the OKX pre-funding and not received yet
+PREFUNDING_PATH = "data/prefunding.json"
+
+# number of the latest recorded actions the delay planner takes the action latency from
+ANALYTICS_LATENCY_SAMPLE_SIZE = 200
+
+# recorded JSON-RPC, 0x and OKX exchanges for offline replays
+CASSETTE_PATH = "data/cassette.jsonl.gz"
+CASSETTE_VERSION = 1
+
 GAS_MULTIPLIER = 1.2
 
+# fees of a replacement transaction are multiplied by this value (nodes require at least +10%)
+TX_FEE_BUMP_MULTIPLIER = 1.15
+
+# backoff (in seconds) of a wallet after its first failed action, doubled after every next failure up to the max
+FAILURE_BACKOFF_BASE = 60
+FAILURE_BACKOFF_MAX = 6 * 60 * 60
+
+# a route that failed for this many wallets in a row is postponed for all wallets
+ROUTE_FAILURES_BEFORE_BACKOFF = 3
+
+# number of the latest failure reasons kept per wallet
+FAILURE_REASONS_KEPT = 5
+
+# pace of the OKX pre-funding withdrawals (OKX allows a few withdrawal requests per second)
+OKX_WITHDRAWALS_PER_SECOND = 1
+
+# the measured fees of the remaining actions are multiplied by this value to get the amount a wallet needs
+PREFUNDING_FEE_MARGIN = 1.5
+
+# how often (in seconds) the balances of the wallets waiting for a withdrawal are re-read
+PREFUNDING_POLL_INTERVAL = 60
+
+# a withdrawal that hasn't arrived after this time (in seconds) is forgotten and the wallet can be funded again
+PREFUNDING_PENDING_MAX_AGE = 3 * 60 * 60
+
+# busy time (in seconds) of one warmup action without delays, used by the delay planner until it is measured
+DEFAULT_ACTION_LATENCY = 60
+
+# weight of the latest measured action in the planner's moving averages
+PLANNER_LATENCY_SMOOTHING = 0.2
+
+# planned delays are randomized by this share around the target delay
+PLANNER_DELAY_JITTER = 0.5
+
+# block time (in seconds) used while a chain's own block time is unknown
+DEFAULT_BLOCK_TIME = 12
+
+# number of the latest blocks the average block time of a chain is measured on
+BLOCK_TIME_SAMPLE_SIZE = 20
+
+# bounds (in seconds) of block-time based receipt timeouts
+MIN_RECEIPT_TIMEOUT = 15
+MAX_RECEIPT_TIMEOUT = 600
+
+# how often (in blocks) the receipt of a sent transaction is polled
+RECEIPT_POLL_BLOCKS = 0.5
+
+# minimal weight of a route whose source RPC has no spare request budget
+MIN_ROUTE_WEIGHT = 0.05
+
 RETRIES = 1
 
+# retries per error class: total attempts and bounds (in seconds) of the jittered exponential backoff
+RETRY_POLICIES = {
+    "transient": {"tries": 4, "base-delay": 1, "max-delay": 30},
+    "rate_limit": {"tries": 6, "base-delay": 2, "max-delay": 60},
+    "nonce": {"tries": 3, "base-delay": 1, "max-delay": 10},
+    "insufficient_funds": {"tries": 1, "base-delay": 0, "max-delay": 0},
+    "permanent": {"tries": 1, "base-delay": 0, "max-delay": 0},
+}
+
+# consecutive transient failures of an endpoint after which its calls fail fast for CIRCUIT_BREAKER_RESET_TIME seconds
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_TIME = 30
+
 APPROVE_VALUE_RANGE = None
 
+# processes used for signing and key derivation when no native secp256k1 backend (coincurve) is installed
+SIGNER_PROCESSES = 2
+
+# minimal number of private keys to derive addresses for in the process pool at once
+SIGNER_BATCH_THRESHOLD = 64
+
+MAX_UINT256 = 2 ** 256 - 1
+
 # tokens abis
 FIAT_TOKEN_ABI = read_from_json(os.path.join(ABI_DIR, "fiat_token_abi.json"))
 L2_ETH_TOKEN_ABI = read_from_json(os.path.join(ABI_DIR, "l2_eth_token_abi.json"))
@@ -76,6 +187,18 @@ NATIVE_TOKEN_CONTRACT_ADDRESS = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
 # zero address
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
+# functions whose gas barely changes between calls, only their gas limits are learned from receipts
+# (0x swaps share one selector, but their gas depends on the route of the quote)
+GAS_CACHE_SELECTORS = {
+    "0x095ea7b3",  # approve(address,uint256)
+    "0x126928c4",  # Merkly bridgeGas(uint16,bytes,bytes)
+    "0x2e15238c",  # Stargate sendTokens(uint16,bytes,uint256,address,bytes)
+    "0xfe359a0d",  # CoreBridge bridge(address,uint256,address,(address,address),bytes)
+}
+
+# topic of the ERC20 Transfer(address,address,uint256) event
+TRANSFER_EVENT_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
 # OKX
 OKX_WITHDRAWAL_CHAIN_TO_DATA = {
     "BSC": {
@@ -100,10 +223,6 @@ OKX_WITHDRAWAL_CHAIN_TO_DATA = {
 
 OKX_WITHDRAWAL_FEE = 0.1
 
-OKX_ON_FAIL_RETRY_COUNT = 5
-
-OKX_AFTER_ERROR_SLEEP_TIME = [60, 60]
-
 OKX_WAIT_FOR_WITHDRAWAL_FINAL_STATUS_MAX_WAIT_TIME = [10, 10]
 
 OKX_WAIT_FOR_WITHDRAWAL_FINAL_STATUS_ATTEMPTS = 100
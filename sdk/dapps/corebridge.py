@@ -7,6 +7,8 @@ from sdk.dapps import ZeroX
 from sdk.decorators import wait
 from sdk.models.chain import Chain, BSC
 from sdk.models.token import USDT_Token, BNB_Token
+from sdk.retry import record_error
+from sdk.tracer import tracer
 
 
 class CoreBridge:
@@ -46,29 +48,57 @@ class CoreBridge:
             fee_args = (True, '0x')
             data = self.bridge_contract.encodeABI('bridge', args=data_args)
 
-            native_fee: list = await self.bridge_contract.functions.estimateBridgeFee(*fee_args).call()
-            tx = await self.account.send_transaction(to=CORE_BRIDGE_CONTRACT_ADDRESS, data=data, value=native_fee[0])
-            if tx:
-                return await self.account.verify_tx(tx_hash=tx)
+            with tracer.span("corebridge.fee_quote", chain=self.account.chain.name):
+                native_fee: list = await self.bridge_contract.functions.estimateBridgeFee(*fee_args).call()
+
+            with tracer.span("corebridge.send", chain=self.account.chain.name):
+                tx = await self.account.send_transaction(
+                    to=CORE_BRIDGE_CONTRACT_ADDRESS,
+                    data=data,
+                    value=native_fee[0]
+                )
+            if tx and await self.account.verify_tx(tx_hash=tx):
+                return self.account.w3.to_hex(tx)
             return False
         except Exception as ex:
+            record_error(ex)
             logger.error(f"[{self.name}] Error while bridging: {ex}")
 
-    async def swap_and_bridge(self, amount: float):
-        zerox = ZeroX(client=self.account, chain=self.account.chain)
+    async def swap_and_bridge(self, amount: float, completed_steps: dict | None = None, on_step=None):
+        completed_steps = completed_steps or {}
 
-        usdt_balance = await self.account.get_token_balance(USDT_Token)
+        if "bridge" in completed_steps:
+            logger.info(f"[{self.name}] Already bridged: {completed_steps['bridge']['tx_hash']}")
+            return completed_steps["bridge"]["tx_hash"]
 
-        if usdt_balance == 0 or USE_SWAP_BEFORE_BRIDGE:
-            if not await zerox.swap(from_token=BNB_Token, to_token=USDT_Token, amount=amount):
-                logger.error(f"[{self.name}] Aborting")
-                return False
+        if "swap" in completed_steps:
+            usdt_balance = completed_steps["swap"]["amount"]
+            logger.info(f"[{self.name}] Already swapped: {completed_steps['swap']['tx_hash']}, resuming from bridge")
+        else:
+            zerox = ZeroX(client=self.account, chain=self.account.chain)
 
             usdt_balance = await self.account.get_token_balance(USDT_Token)
 
+            if usdt_balance == 0 or USE_SWAP_BEFORE_BRIDGE:
+                swap_tx_hash = await zerox.swap(from_token=BNB_Token, to_token=USDT_Token, amount=amount)
+                if not swap_tx_hash:
+                    logger.error(f"[{self.name}] Aborting")
+                    return False
+
+                with tracer.span("corebridge.post_swap_balance", chain=self.account.chain.name):
+                    usdt_balance = await self.account.get_token_balance(USDT_Token)
+
+                if on_step:
+                    on_step("swap", swap_tx_hash, usdt_balance)
+
         if USE_SWAP_BEFORE_BRIDGE:
             amount_to_bridge = round(usdt_balance * 0.999, ROUND_TO)
         else:
             amount_to_bridge = round(usdt_balance * TOKEN_USE_PERCENTAGE, ROUND_TO)
 
-        return await self.bridge(amount=amount_to_bridge)
+        tx_hash = await self.bridge(amount=amount_to_bridge)
+
+        if tx_hash and on_step:
+            on_step("bridge", tx_hash, amount_to_bridge)
+
+        return tx_hash
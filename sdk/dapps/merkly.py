@@ -8,8 +8,11 @@ from sdk.constants import (
     RETRIES
 )
 from sdk.decorators import wait
+from sdk.metrics import record_action_error
+from sdk.retry import ErrorKind, record_error
 from ..models.chain import Chain
 from ..models.token import ETH_Token
+from ..tracer import tracer
 from ..utils import retry_on_fail
 
 
@@ -28,6 +31,7 @@ class Merkly:
         )
 
     @retry_on_fail(tries=RETRIES)
+    @tracer.trace("merkly.fee_quote")
     async def get_bridge_fee_params(self, dst_chain_id: int, value: int):
         data = self.account.w3.to_hex(
             encode_packed(
@@ -54,6 +58,7 @@ class Merkly:
             amount = ETH_Token.from_wei(fee)
             if balance < amount:
                 logger.error(f"[{self.name}] Insufficient balance to bridge: {balance} < {amount}")
+                record_action_error(ErrorKind.INSUFFICIENT_FUNDS.value, f"balance {balance} < fee {amount}")
                 return False
 
             data = self.contract.encodeABI('bridgeGas', args=(
@@ -62,10 +67,13 @@ class Merkly:
                 adapter_params
             ))
 
-            tx_hash = await self.account.send_transaction(to=self.refuel_address, data=data, value=fee)
+            with tracer.span("merkly.send", chain=src_chain.name, dst=dst_chain.name):
+                tx_hash = await self.account.send_transaction(to=self.refuel_address, data=data, value=fee)
             if tx_hash:
                 return await self.account.verify_tx(tx_hash=tx_hash)
         except Exception as e:
+            record_error(e)
+
             if "dstNativeAmt too large" in str(e):
                 logger.error(
                     f"[{self.name}] Amount to bridge exceeds max possible value for {src_chain.name}-{dst_chain.name}"
@@ -8,6 +8,8 @@ from sdk.decorators import wait
 from sdk.models.chain import Chain
 from sdk.models.chain import Polygon, Kava
 from sdk.models.token import ETH_Token, MATIC_Token, STG_Token
+from sdk.retry import record_error
+from sdk.tracer import tracer
 
 
 class Stargate:
@@ -23,6 +25,7 @@ class Stargate:
             address=STG_TOKEN_CONTRACT_ADDRESS
         )
 
+    @tracer.trace("stargate.fee_quote")
     async def get_bridge_fee_params(self):
         data = self.account.w3.to_hex(encode_packed(["uint16", "uint"], [1, 85000]))
         fee = await self.contract.functions.estimateSendTokensFee(177, False, data).call()
@@ -44,29 +47,51 @@ class Stargate:
             ))
 
             logger.info(f"[{self.name}] Bridging {amount} STG from {Polygon.name} to {Kava.name}")
-            tx_hash = await self.account.send_transaction(to=STG_TOKEN_CONTRACT_ADDRESS, data=data, value=fee)
+            with tracer.span("stargate.send", chain=self.account.chain.name):
+                tx_hash = await self.account.send_transaction(to=STG_TOKEN_CONTRACT_ADDRESS, data=data, value=fee)
             if tx_hash:
                 if await self.account.verify_tx(tx_hash=tx_hash):
-                    return True
+                    return self.account.w3.to_hex(tx_hash)
             return False
         except Exception as ex:
+            record_error(ex)
             logger.error(f"[{self.name}] Error while bridging: {ex}")
 
-    async def swap_and_bridge(self, amount: float):
-        zerox = ZeroX(client=self.account, chain=self.account.chain)
+    async def swap_and_bridge(self, amount: float, completed_steps: dict | None = None, on_step=None):
+        completed_steps = completed_steps or {}
 
-        stg_balance = await self.account.get_token_balance(STG_Token)
+        if "bridge" in completed_steps:
+            logger.info(f"[{self.name}] Already bridged: {completed_steps['bridge']['tx_hash']}")
+            return completed_steps["bridge"]["tx_hash"]
 
-        if stg_balance == 0 or USE_SWAP_BEFORE_BRIDGE:
-            if not await zerox.swap(from_token=MATIC_Token, to_token=STG_Token, amount=amount):
-                logger.error(f"[{self.name}] Aborting")
-                return False
+        if "swap" in completed_steps:
+            stg_balance = completed_steps["swap"]["amount"]
+            logger.info(f"[{self.name}] Already swapped: {completed_steps['swap']['tx_hash']}, resuming from bridge")
+        else:
+            zerox = ZeroX(client=self.account, chain=self.account.chain)
 
             stg_balance = await self.account.get_token_balance(STG_Token)
 
+            if stg_balance == 0 or USE_SWAP_BEFORE_BRIDGE:
+                swap_tx_hash = await zerox.swap(from_token=MATIC_Token, to_token=STG_Token, amount=amount)
+                if not swap_tx_hash:
+                    logger.error(f"[{self.name}] Aborting")
+                    return False
+
+                with tracer.span("stargate.post_swap_balance", chain=self.account.chain.name):
+                    stg_balance = await self.account.get_token_balance(STG_Token)
+
+                if on_step:
+                    on_step("swap", swap_tx_hash, stg_balance)
+
         if USE_SWAP_BEFORE_BRIDGE:
             amount_to_bridge = round(stg_balance * 0.999, ROUND_TO)
         else:
             amount_to_bridge = round(stg_balance * TOKEN_USE_PERCENTAGE, ROUND_TO)
 
-        return await self.bridge(amount=amount_to_bridge)
+        tx_hash = await self.bridge(amount=amount_to_bridge)
+
+        if tx_hash and on_step:
+            on_step("bridge", tx_hash, amount_to_bridge)
+
+        return tx_hash
@@ -1,14 +1,15 @@
-import asyncio
-
 import aiohttp
 from web3 import Web3
 
 from config import ZEROX_API_KEY, MAX_SLIPPAGE, TX_DELAY_RANGE
+from sdk.cassette import cassette
 from sdk.client import Client
 from sdk.decorators import wait
 from sdk.logger import logger
 from sdk.models.chain import Chain
 from sdk.models.token import Token
+from sdk.retry import record_error, retry_engine
+from sdk.tracer import tracer
 
 
 class ZeroX:
@@ -19,6 +20,7 @@ class ZeroX:
         if self.account.chain != chain:
             self.account.change_chain(chain)
 
+    @tracer.trace("0x.quote")
     async def get_0x_quote(self, value, from_token: Token, to_token: Token):
         from_token = from_token.chain_to_contract_mapping[self.account.chain.name]
         to_token = to_token.chain_to_contract_mapping[self.account.chain.name]
@@ -44,26 +46,24 @@ class ZeroX:
         headers = {'0x-api-key': ZEROX_API_KEY}
 
         try:
-            if not self.account.proxy:
-                connector = None
-            else:
-                connector = self.account.get_proxy_connector()
-            max_attempts = 10
-
-            for attempt in range(max_attempts):
-                async with aiohttp.ClientSession(connector=connector) as session:
-                    async with session.get(url, headers=headers) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            return result
-                        logger.info(f'Attempt to get a response {attempt + 1}/{max_attempts}')
-                        await asyncio.sleep(1)
-            logger.error("Couldn't get a response")
-            return False
+            return await retry_engine.run(self._fetch_quote, url=url, headers=headers, endpoint="0x")
         except Exception as ex:
             logger.error(f"[{self.name}] Failed to fetch quote: {ex}")
             return False
 
+    async def _fetch_quote(self, url: str, headers: dict) -> dict:
+        return await cassette.exchange("0x", "0x", "quote", url, lambda: self._request_quote(url=url, headers=headers))
+
+    async def _request_quote(self, url: str, headers: dict) -> dict:
+        # a connector is closed together with its session, so every attempt needs a new one
+        connector = self.account.get_proxy_connector()
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async with session.get(url, headers=headers) as response:
+                # 429 and 5xx are retried with backoff, other 4xx (e.g. no liquidity) fail fast
+                response.raise_for_status()
+                return await response.json()
+
     @wait(delay_range=TX_DELAY_RANGE)
     async def swap(self, from_token: Token, to_token: Token, amount: float = None):
         try:
@@ -88,16 +88,18 @@ class ZeroX:
             if not await self.account.approve(spender=spender, token=from_token, value=from_token.to_wei(value=value)):
                 return False
 
-            tx = await self.account.send_transaction(
-                to=Web3.to_checksum_address(json_data["to"]),
-                data=json_data["data"],
-                value=int(json_data["value"])
-            )
+            with tracer.span("0x.swap", chain=self.account.chain.name, pair=f"{from_token.symbol}-{to_token.symbol}"):
+                tx = await self.account.send_transaction(
+                    to=Web3.to_checksum_address(json_data["to"]),
+                    data=json_data["data"],
+                    value=int(json_data["value"])
+                )
 
             if tx:
                 if await self.account.verify_tx(tx_hash=tx):
-                    return True
+                    return self.account.w3.to_hex(tx)
             return False
 
         except Exception as ex:
+            record_error(ex)
             logger.error(f"[{self.name}] Error occurred: {ex}")
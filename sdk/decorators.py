@@ -1,14 +1,22 @@
 from functools import wraps
 
-from sdk.utils import sleep_pause
+from sdk.delay_planner import delay_planner
 
 
 def wait(delay_range: list):
     def decorator(func):
         @wraps(func)
         async def wrapper(self, *args, **kwargs):
+            account = getattr(self, "account", None)
+            sent_before = getattr(account, "sent_transactions", None)
+
             result = await func(self, *args, **kwargs)
-            await sleep_pause(delay_range=delay_range, enable_message=False)
+
+            # nothing was broadcast (e.g. the transaction failed simulation), so there is nothing to wait for
+            if sent_before is not None and account.sent_transactions == sent_before:
+                return result
+
+            await delay_planner.sleep(delay_range=delay_range)
             return result
 
         return wrapper
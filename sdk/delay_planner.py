@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+from config import WARMUP_DEADLINE, DEADLINE_MIN_TX_DELAY, TX_DELAY_RANGE
+from sdk.constants import DEFAULT_ACTION_LATENCY, PLANNER_DELAY_JITTER, PLANNER_LATENCY_SMOOTHING
+from sdk.logger import logger
+from sdk.tracer import tracer
+from sdk.utils import sleep_pause
+
+
+def parse_deadline(deadline: str | None) -> float | None:
+    return datetime.fromisoformat(deadline).timestamp() if deadline else None
+
+
+class DelayPlanner:
+    """Stretches or shrinks the delays between transactions so that the remaining actions end by the deadline.
+
+    The time left is split evenly between the remaining actions. Every action costs its measured latency
+    (RPC calls, confirmations, OKX withdrawals) plus its delays, so the delays get what is left of
+    the share, randomized by ±``PLANNER_DELAY_JITTER``. Without a deadline ``TX_DELAY_RANGE`` is used as is.
+    """
+
+    def __init__(self, deadline: float | None = parse_deadline(WARMUP_DEADLINE), min_delay: float = DEADLINE_MIN_TX_DELAY):
+        self.deadline = deadline
+        self.min_delay = min_delay
+        self.remaining = 0
+        self.latency = DEFAULT_ACTION_LATENCY
+        self.delays_per_action = 1.0
+        self._slept = 0.0
+        self._delays = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.deadline is not None
+
+    def start(self, remaining_actions: int, latency: float | None = None) -> None:
+        """``latency`` is the busy time of an action measured in earlier runs (without the delays), if known."""
+        self.remaining = remaining_actions
+
+        if latency:
+            self.latency = latency
+
+        if self.enabled:
+            logger.info(
+                f"[Planner] {remaining_actions} actions until {_format_time(self.deadline)}, "
+                f"projected end {_format_time(self.projected_end())}",
+                send_to_tg=False
+            )
+
+    def get_target_delay(self) -> float:
+        """Mean delay between transactions that makes the remaining actions end exactly at the deadline."""
+        time_left = self.deadline - time.time()
+        share = time_left / max(self.remaining, 1)
+        return max((share - self.latency) / self.delays_per_action, self.min_delay)
+
+    def get_delay_range(self, delay_range: List[int]) -> List[int]:
+        if not self.enabled:
+            return delay_range
+
+        target = self.get_target_delay()
+        low = max(int(target * (1 - PLANNER_DELAY_JITTER)), int(self.min_delay))
+        return [low, max(int(target * (1 + PLANNER_DELAY_JITTER)), low)]
+
+    def projected_end(self) -> float:
+        delay = self.get_target_delay() if self.enabled else sum(TX_DELAY_RANGE) / 2
+        return time.time() + self.remaining * (self.latency + self.delays_per_action * delay)
+
+    def get_required_workers(self, remaining_actions: int, latency: float | None = None) -> int:
+        """Number of processes that finish ``remaining_actions`` by the deadline with the usual ``TX_DELAY_RANGE``."""
+        time_left = self.deadline - time.time()
+        action_time = (latency or self.latency) + self.delays_per_action * sum(TX_DELAY_RANGE) / 2
+
+        if time_left <= 0:
+            return remaining_actions
+        return max(math.ceil(remaining_actions * action_time / time_left), 1)
+
+    async def sleep(self, delay_range: List[int]) -> None:
+        started = time.monotonic()
+
+        with tracer.span("tx.delay"):
+            await sleep_pause(delay_range=self.get_delay_range(delay_range), enable_message=False)
+
+        self._slept += time.monotonic() - started
+        self._delays += 1
+
+    @contextmanager
+    def action(self):
+        """Measures the busy time of one warmup action, i.e. its duration without the planned delays."""
+        self._slept = 0.0
+        self._delays = 0
+        started = time.monotonic()
+
+        try:
+            yield
+        finally:
+            busy = max(time.monotonic() - started - self._slept, 0)
+            self.latency += PLANNER_LATENCY_SMOOTHING * (busy - self.latency)
+
+            if self._delays:
+                self.delays_per_action += PLANNER_LATENCY_SMOOTHING * (self._delays - self.delays_per_action)
+
+    def action_completed(self) -> None:
+        self.remaining = max(self.remaining - 1, 0)
+
+        if not self.enabled or not self.remaining:
+            return
+
+        projected_end = self.projected_end()
+        message = (
+            f"[Planner] {self.remaining} actions left, projected end {_format_time(projected_end)} "
+            f"(deadline {_format_time(self.deadline)}, next delays {self.get_delay_range(TX_DELAY_RANGE)} s)"
+        )
+
+        # with the minimal delays the actions alone take longer than the time left
+        if projected_end > self.deadline + self.latency:
+            logger.warning(f"{message}, the deadline can't be met", send_to_tg=False)
+        else:
+            logger.info(message, send_to_tg=False)
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+delay_planner = DelayPlanner()
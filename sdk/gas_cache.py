@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Dict, Set
+
+from config import GAS_LIMIT_CACHE_MULTIPLIER
+from sdk.constants import GAS_CACHE_SELECTORS
+
+
+class GasLimitCache:
+    """Gas limits learned from receipts per (chain, contract, function selector).
+
+    Bridge and approve calls use almost the same gas every time, so the largest ``gasUsed``
+    seen for a function times ``multiplier`` replaces ``eth_estimateGas``. Only the functions in
+    ``selectors`` are learned, everything else (e.g. swaps) is always estimated. A failed transaction
+    drops its entry and the next send estimates live again.
+    """
+
+    def __init__(self, multiplier: float = GAS_LIMIT_CACHE_MULTIPLIER, selectors: Set[str] = GAS_CACHE_SELECTORS) -> None:
+        self.multiplier = multiplier
+        self.selectors = selectors
+        self._gas_used: Dict[tuple[int, str, str], int] = {}
+
+    @staticmethod
+    def _key(chain_id: int, to: str, data: str | None) -> tuple[int, str, str]:
+        selector = data[:10] if data else "0x"
+        return chain_id, to.lower(), selector.lower()
+
+    def get(self, chain_id: int, to: str, data: str | None) -> int | None:
+        gas_used = self._gas_used.get(self._key(chain_id, to, data))
+        return int(gas_used * self.multiplier) if gas_used is not None else None
+
+    def record(self, chain_id: int, to: str, data: str | None, gas_used: int) -> None:
+        key = self._key(chain_id, to, data)
+
+        if key[2] not in self.selectors:
+            return
+
+        self._gas_used[key] = max(self._gas_used.get(key, 0), gas_used)
+
+    def invalidate(self, chain_id: int, to: str, data: str | None) -> None:
+        self._gas_used.pop(self._key(chain_id, to, data), None)
+
+
+gas_cache = GasLimitCache()
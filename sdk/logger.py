@@ -1,9 +1,13 @@
+import os
+import sys
 from enum import Enum
 
-import telebot
 from loguru import logger as loguru_logger
 
-from config import TG_TOKEN, TG_IDS, USE_TG_BOT
+from config import TG_TOKEN, TG_IDS, USE_TG_BOT, LOG_LEVEL, USE_JSON_LOGS, JSON_LOG_ROTATION
+
+# structured log of every run, one JSON record per line with wallet/chain/dapp/action/tx_hash in "extra"
+JSON_LOG_PATH = "data/logs/log.jsonl"
 
 
 class Icons(Enum):
@@ -14,38 +18,82 @@ class Icons(Enum):
     DEBUG = "🟣"
 
 
+def setup_loguru() -> int:
+    """Replaces the default stderr handler with queued ones, so writes don't block the event loop.
+
+    Returns the lowest enabled level number.
+    """
+    loguru_logger.remove()
+    loguru_logger.add(sys.stderr, level=LOG_LEVEL, enqueue=True)
+
+    if USE_JSON_LOGS:
+        os.makedirs(os.path.dirname(JSON_LOG_PATH), exist_ok=True)
+        loguru_logger.add(
+            JSON_LOG_PATH,
+            level=LOG_LEVEL,
+            serialize=True,
+            enqueue=True,
+            rotation=JSON_LOG_ROTATION,
+            compression="gz"
+        )
+
+    return loguru_logger.level(LOG_LEVEL).no
+
+
 class CustomLogger:
     def __init__(self, telegram_logger):
         self.telegram_logger = telegram_logger
         self.loguru_logger = loguru_logger
+        self.min_level_no = setup_loguru()
+
+    def is_enabled(self, level: str) -> bool:
+        return self.loguru_logger.level(level).no >= self.min_level_no
 
-    def success(self, message: str, send_to_tg=True) -> None:
-        self.loguru_logger.success(message)
+    def contextualize(self, **fields):
+        """Adds ``fields`` (wallet, chain, dapp, action, ...) to every record logged inside the block."""
+        return self.loguru_logger.contextualize(**fields)
+
+    def _log(self, level: str, message: str, args: tuple, fields: dict) -> None:
+        if not self.is_enabled(level):
+            return
+
+        # depth=2 attributes the record to the caller of success()/error()/... instead of this module,
+        # loguru formats the message with args only once a handler takes the record
+        target = self.loguru_logger.bind(**fields) if fields else self.loguru_logger
+        target.opt(depth=2).log(level, message, *args)
+
+    def _send_tg(self, icon: Icons, message: str, args: tuple) -> None:
+        if USE_TG_BOT:
+            self.telegram_logger(f"{icon.value} {message.format(*args) if args else message}")
+
+    def success(self, message: str, *args, send_to_tg=True, **fields) -> None:
+        self._log("SUCCESS", message, args, fields)
         if send_to_tg:
-            self.telegram_logger(f"{Icons.SUCCESS.value} {message}")
+            self._send_tg(Icons.SUCCESS, message, args)
 
-    def error(self, message: str, send_to_tg=True) -> None:
-        self.loguru_logger.error(message)
+    def error(self, message: str, *args, send_to_tg=True, **fields) -> None:
+        self._log("ERROR", message, args, fields)
         if send_to_tg:
-            self.telegram_logger(f"{Icons.ERROR.value} {message}")
+            self._send_tg(Icons.ERROR, message, args)
 
-    def warning(self, message: str, send_to_tg=True) -> None:
-        self.loguru_logger.warning(message)
+    def warning(self, message: str, *args, send_to_tg=True, **fields) -> None:
+        self._log("WARNING", message, args, fields)
         if send_to_tg:
-            self.telegram_logger(f"{Icons.WARNING.value} {message}")
+            self._send_tg(Icons.WARNING, message, args)
 
-    def info(self, message: str, send_to_tg=True) -> None:
-        self.loguru_logger.info(message)
+    def info(self, message: str, *args, send_to_tg=True, **fields) -> None:
+        self._log("INFO", message, args, fields)
         if send_to_tg:
-            self.telegram_logger(f"{Icons.INFO.value} {message}")
+            self._send_tg(Icons.INFO, message, args)
 
-    def debug(self, message: str, send_to_tg=True) -> None:
-        self.loguru_logger.debug(message)
+    def debug(self, message: str, *args, send_to_tg=True, **fields) -> None:
+        self._log("DEBUG", message, args, fields)
         if send_to_tg:
-            self.telegram_logger(f"{Icons.DEBUG.value} {message}")
+            self._send_tg(Icons.DEBUG, message, args)
 
-    def exception(self, message: str) -> None:
-        self.loguru_logger.exception(message)
+    def exception(self, message: str, *args, **fields) -> None:
+        target = self.loguru_logger.bind(**fields) if fields else self.loguru_logger
+        target.opt(depth=1, exception=True).error(message, *args)
 
     @staticmethod
     def send_message_telegram(bot, text: str):
@@ -58,7 +106,12 @@ class CustomLogger:
 
     @staticmethod
     def tg_logger(text):
-        bot = telebot.TeleBot(TG_TOKEN, disable_web_page_preview=True) if USE_TG_BOT else None
+        if not USE_TG_BOT:
+            return
+
+        import telebot
+
+        bot = telebot.TeleBot(TG_TOKEN, disable_web_page_preview=True)
         CustomLogger.send_message_telegram(bot, text)
 
 
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass
+class ActionMetrics:
+    """Everything measured while one warmup action runs, filled in by the SDK layers it passes through."""
+
+    address: str
+    route: str
+    dapp: str
+    chain: str
+    proxy: str | None = None
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    success: bool = False
+    phases: Dict[str, float] = field(default_factory=dict)
+    gas_used: int = 0
+    fee_paid: int = 0
+    # msg.value of the successful transactions (bridge fees, refuel and swap amounts)
+    value_sent: int = 0
+    retries: int = 0
+    error_class: str | None = None
+    # the last error of the action, also when a dapp caught it and returned False
+    error: str | None = None
+
+    @property
+    def effective_gas_price(self) -> int:
+        return self.fee_paid // self.gas_used if self.gas_used else 0
+
+    def add_phase(self, name: str, duration: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def add_receipt(self, receipt: dict, value: int = 0) -> None:
+        gas_used = receipt.get("gasUsed", 0)
+        self.gas_used += gas_used
+        self.fee_paid += gas_used * receipt.get("effectiveGasPrice", 0)
+
+        if receipt.get("status") == 1:
+            self.value_sent += value
+
+    def add_retry(self) -> None:
+        self.retries += 1
+
+    def add_error(self, kind: str, message: str) -> None:
+        self.error_class = kind
+        self.error = message
+
+
+_action_metrics: ContextVar[ActionMetrics | None] = ContextVar("action_metrics", default=None)
+
+
+def get_action_metrics() -> ActionMetrics | None:
+    return _action_metrics.get()
+
+
+def set_action_metrics(metrics: ActionMetrics | None):
+    return _action_metrics.set(metrics)
+
+
+def reset_action_metrics(token) -> None:
+    _action_metrics.reset(token)
+
+
+def record_action_error(kind: str, message: str) -> None:
+    metrics = get_action_metrics()
+    if metrics is not None:
+        metrics.add_error(kind, message)
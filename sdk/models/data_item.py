@@ -1,54 +1,209 @@
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
+from array import array
+from typing import Any, Callable, Dict, List
 
-from sdk.dapps import Stargate, CoreBridge
-from sdk.dapps.merkly import Merkly
+from sdk import logger
 from sdk.models.chain import Chain
+from sdk.models.route import ROUTES, Route
+
+
+def get_dapp(name: str):
+    # dapps import web3, which is not needed to create or read the database
+    from sdk import dapps
+
+    return getattr(dapps, name)
+
+
+# counters of the routes that are stored as plain numbers in the database
+STARGATE_ROUTE_ID = ROUTES.find_id("Polygon-Kava", "Stargate")
+CORE_BRIDGE_ROUTE_ID = ROUTES.find_id("BSC-Core", "CoreBridge")
 
 
-@dataclass
 class DataItem:
-    private_key: str
-    address: str
-    proxy: str
-    deposit_address: str
-    merkly_tx_count: dict[str, dict[str, int]]
-    stargate_tx_count: int
-    core_bridge_tx_count: int
-    chain_with_funds: Chain | None = None,
-    warmup_started: bool = False
-    warmup_finished: bool = False
-    okx_withdrawn: bool = False
-    polygon_from_usdc_swapped: bool = False
-    from_polygon_ageur_bridged: bool = False
-    to_polygon_ageur_bridged: bool = False
-    polygon_to_usdc_swapped: bool = False
-    sent_to_okx: bool = False
-
-    def get_random_warmup_action(self):
-        dapps_and_actions = []
-
-        if self.stargate_tx_count > 0:
-            dapps_and_actions.append((
-                "Polygon-Kava", Stargate
-            ))
-
-        if self.core_bridge_tx_count > 0:
-            dapps_and_actions.append((
-                "BSC-Core", CoreBridge
-            ))
-
-        for key, value in self.merkly_tx_count.items():
-            for chain, count in value.items():
-                if count > 0:
-                    dapps_and_actions.append((f"{key}-{chain}", Merkly))
-
-        if not dapps_and_actions:
-            return None, None
-
-        return random.choice(dapps_and_actions)
+    __slots__ = (
+        "private_key",
+        "address",
+        "proxy",
+        "deposit_address",
+        "chain_with_funds",
+        "warmup_started",
+        "warmup_finished",
+        "okx_withdrawn",
+        "polygon_from_usdc_swapped",
+        "from_polygon_ageur_bridged",
+        "to_polygon_ageur_bridged",
+        "polygon_to_usdc_swapped",
+        "sent_to_okx",
+        "step_checkpoints",
+        "_counters",
+        "_active",
+        "_positions",
+        "_total",
+    )
+
+    def __init__(
+            self,
+            private_key: str,
+            address: str,
+            proxy: str,
+            deposit_address: str,
+            merkly_tx_count: dict[str, dict[str, int]],
+            stargate_tx_count: int,
+            core_bridge_tx_count: int,
+            chain_with_funds: Chain | None = None,
+            warmup_started: bool = False,
+            warmup_finished: bool = False,
+            okx_withdrawn: bool = False,
+            polygon_from_usdc_swapped: bool = False,
+            from_polygon_ageur_bridged: bool = False,
+            to_polygon_ageur_bridged: bool = False,
+            polygon_to_usdc_swapped: bool = False,
+            sent_to_okx: bool = False,
+            step_checkpoints: dict[str, dict] | None = None,
+    ) -> None:
+        self.private_key = private_key
+        self.address = address
+        self.proxy = proxy
+        self.deposit_address = deposit_address
+        self.chain_with_funds = chain_with_funds
+        self.warmup_started = warmup_started
+        self.warmup_finished = warmup_finished
+        self.okx_withdrawn = okx_withdrawn
+        self.polygon_from_usdc_swapped = polygon_from_usdc_swapped
+        self.from_polygon_ageur_bridged = from_polygon_ageur_bridged
+        self.to_polygon_ageur_bridged = to_polygon_ageur_bridged
+        self.polygon_to_usdc_swapped = polygon_to_usdc_swapped
+        self.sent_to_okx = sent_to_okx
+        self.step_checkpoints = step_checkpoints or {}
+
+        self._counters = array("I", bytes(4 * len(ROUTES)))
+        self._active = array("H")
+        self._positions = array("h", [-1]) * len(ROUTES)
+        self._total = 0
+
+        self.stargate_tx_count = stargate_tx_count
+        self.core_bridge_tx_count = core_bridge_tx_count
+        self.merkly_tx_count = merkly_tx_count
+
+    def __eq__(self, other) -> bool:
+        return (
+                isinstance(other, DataItem)
+                and self.private_key == other.private_key
+                and self.address == other.address
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.address)
+
+    def __repr__(self) -> str:
+        return f"DataItem(address={self.address}, tx_count={self._total})"
+
+    def get_count(self, route_id: int | None) -> int:
+        return self._counters[route_id] if route_id is not None else 0
+
+    def set_count(self, route_id: int | None, count: int) -> None:
+        if route_id is None:
+            if count:
+                logger.warning(f"[Database] {self.address}: route is not in config, {count} txs are dropped", send_to_tg=False)
+            return
+
+        self._total += count - self._counters[route_id]
+        self._counters[route_id] = count
+
+        if count > 0 and self._positions[route_id] == -1:
+            self._positions[route_id] = len(self._active)
+            self._active.append(route_id)
+        elif count == 0 and self._positions[route_id] != -1:
+            position = self._positions[route_id]
+            last_route_id = self._active[-1]
+            self._active[position] = last_route_id
+            self._positions[last_route_id] = position
+            self._active.pop()
+            self._positions[route_id] = -1
+
+    @property
+    def active_route_ids(self) -> List[int]:
+        return list(self._active)
+
+    @property
+    def stargate_tx_count(self) -> int:
+        return self.get_count(STARGATE_ROUTE_ID)
+
+    @stargate_tx_count.setter
+    def stargate_tx_count(self, value: int) -> None:
+        self.set_count(STARGATE_ROUTE_ID, value)
+
+    @property
+    def core_bridge_tx_count(self) -> int:
+        return self.get_count(CORE_BRIDGE_ROUTE_ID)
+
+    @core_bridge_tx_count.setter
+    def core_bridge_tx_count(self, value: int) -> None:
+        self.set_count(CORE_BRIDGE_ROUTE_ID, value)
+
+    @property
+    def merkly_tx_count(self) -> dict[str, dict[str, int]]:
+        merkly_tx_count = {}
+
+        for route in ROUTES.get_by_dapp("Merkly"):
+            # keys are the chain names used in config, not Chain.name
+            src_chain, dst_chain = route.action.split("-")
+            merkly_tx_count.setdefault(src_chain, {})[dst_chain] = self.get_count(route.route_id)
+
+        return merkly_tx_count
+
+    @merkly_tx_count.setter
+    def merkly_tx_count(self, value: dict[str, dict[str, int]]) -> None:
+        for src_chain, dst_chains in value.items():
+            for dst_chain, count in dst_chains.items():
+                self.set_count(ROUTES.find_id(f"{src_chain}-{dst_chain}", "Merkly"), count)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "private_key": self.private_key,
+            "address": self.address,
+            "proxy": self.proxy,
+            "deposit_address": self.deposit_address,
+            "merkly_tx_count": self.merkly_tx_count,
+            "stargate_tx_count": self.stargate_tx_count,
+            "core_bridge_tx_count": self.core_bridge_tx_count,
+            "chain_with_funds": self.chain_with_funds,
+            "warmup_started": self.warmup_started,
+            "warmup_finished": self.warmup_finished,
+            **self.get_item_state(),
+            "step_checkpoints": self.step_checkpoints,
+        }
+
+    def get_random_route(self, route_weight: Callable[[Route], float] | None = None) -> Route | None:
+        if not self._active:
+            return None
+
+        if route_weight is None:
+            route_id = self._active[random.randrange(len(self._active))]
+        else:
+            weights = [route_weight(ROUTES[route_id]) for route_id in self._active]
+            route_id = random.choices(self._active, weights=weights)[0]
+
+        return ROUTES[route_id]
+
+    def get_resumable_route(self) -> Route | None:
+        """Returns the first route with already completed steps (e.g. swapped, but not bridged yet)."""
+        for action, checkpoint in self.step_checkpoints.items():
+            route_id = ROUTES.find_id(action, checkpoint["dapp"])
+
+            if route_id is not None and self.get_count(route_id) > 0:
+                return ROUTES[route_id]
+
+        return None
+
+    def get_completed_steps(self, action: str) -> dict[str, dict]:
+        return self.step_checkpoints.get(action, {}).get("steps", {})
+
+    def save_step(self, action: str, dapp: str, step: str, tx_hash: str | None = None, amount: float | None = None):
+        checkpoint = self.step_checkpoints.setdefault(action, {"dapp": dapp, "steps": {}})
+        checkpoint["steps"][step] = {"tx_hash": tx_hash, "amount": amount}
 
     def get_item_state(self):
         state = {
@@ -62,36 +217,13 @@ class DataItem:
         return state
 
     def get_tx_count(self):
-        total_transactions = 0
+        return self._total
 
-        total_transactions += self.stargate_tx_count + self.core_bridge_tx_count
+    def decrease_route_count(self, route_id: int, amount: int = 1) -> bool:
+        current_count = self.get_count(route_id)
 
-        for key, chains in self.merkly_tx_count.items():
-            for chain, value in chains.items():
-                total_transactions += value
-
-        return total_transactions
-
-    def decrease_action_count(self, action: str, dapp: str, amount: int = 1) -> bool:
-        if action == "Polygon-Kava" and dapp == "Stargate":
-            attribute_name = f"stargate_tx_count"
-        elif action == "BSC-Core" and dapp == "CoreBridge":
-            attribute_name = f"core_bridge_tx_count"
-        else:
-            chains = action.split('-')
-            if self.merkly_tx_count[chains[0]][chains[1]] >= amount:
-                self.merkly_tx_count[chains[0]][chains[1]] -= 1
-                return True
-            else:
-                return False
-
-        if hasattr(self, attribute_name):
-            current_count = getattr(self, attribute_name)
-
-            if current_count >= amount:
-                setattr(self, attribute_name, current_count - amount)
-                return True
-            else:
-                return False
-        else:
-            return False
+        if current_count >= amount:
+            self.set_count(route_id, current_count - amount)
+            self.step_checkpoints.pop(ROUTES[route_id].action, None)
+            return True
+        return False
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+from config import MERKLY_TX_COUNT, STARGATE_TX_COUNT, CORE_TX_COUNT
+from sdk.constants import (
+    CORE_BRIDGE_CONTRACT_ADDRESS,
+    MERKLY_CHAIN_TO_REFUEL_CONTRACT_ADDRESS,
+    STG_TOKEN_CONTRACT_ADDRESS
+)
+from sdk.models.chain import Chain, NAMES_TO_CHAINS
+
+
+@dataclass(frozen=True)
+class Route:
+    route_id: int
+    action: str
+    dapp: str
+    src_chain: Chain
+    dst_chain: Chain
+    tx_range: tuple[int, int]
+    amount_range: tuple[float, float]
+    contract: str | None
+
+
+class RouteRegistry:
+    """Every (action, dapp) route of the warmup, compiled once from config.
+
+    Route ids are positions in ``routes`` and index the tx counters of every DataItem.
+    """
+
+    def __init__(self, routes: Iterable[Route]) -> None:
+        self.routes = tuple(routes)
+        self._ids: Dict[tuple[str, str], int] = {(route.action, route.dapp): route.route_id for route in self.routes}
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def __getitem__(self, route_id: int) -> Route:
+        return self.routes[route_id]
+
+    def __iter__(self):
+        return iter(self.routes)
+
+    def find_id(self, action: str, dapp: str) -> int | None:
+        return self._ids.get((action, dapp))
+
+    def get(self, action: str, dapp: str) -> Route | None:
+        route_id = self.find_id(action, dapp)
+        return self.routes[route_id] if route_id is not None else None
+
+    def get_by_dapp(self, dapp: str) -> List[Route]:
+        return [route for route in self.routes if route.dapp == dapp]
+
+    @classmethod
+    def compile(
+            cls,
+            stargate_tx_count: dict = STARGATE_TX_COUNT,
+            core_tx_count: dict = CORE_TX_COUNT,
+            merkly_tx_count: dict = MERKLY_TX_COUNT
+    ) -> "RouteRegistry":
+        routes_config = [(action, "Stargate", params, STG_TOKEN_CONTRACT_ADDRESS) for action, params in stargate_tx_count.items()]
+        routes_config += [(action, "CoreBridge", params, CORE_BRIDGE_CONTRACT_ADDRESS) for action, params in core_tx_count.items()]
+        routes_config += [
+            (f"{src_chain}-{dst_chain}", "Merkly", params, MERKLY_CHAIN_TO_REFUEL_CONTRACT_ADDRESS.get(src_chain))
+            for src_chain, dst_chains in merkly_tx_count.items()
+            for dst_chain, params in dst_chains.items()
+        ]
+
+        routes = []
+
+        for route_id, (action, dapp, params, contract) in enumerate(routes_config):
+            src_chain, dst_chain = action.split("-")
+
+            if src_chain not in NAMES_TO_CHAINS or dst_chain not in NAMES_TO_CHAINS:
+                raise ValueError(f"Unknown chain in {dapp} route {action}")
+
+            routes.append(Route(
+                route_id=route_id,
+                action=action,
+                dapp=dapp,
+                src_chain=NAMES_TO_CHAINS[src_chain],
+                dst_chain=NAMES_TO_CHAINS[dst_chain],
+                tx_range=tuple(params["tx-range"]),
+                amount_range=tuple(params["amount-range"]),
+                contract=contract
+            ))
+
+        return cls(routes)
+
+    async def validate(self, route_ids: Iterable[int]) -> List[str]:
+        """Checks that the routes have a contract and that the RPCs of their source and destination chains respond.
+
+        Returns the found problems, every RPC is queried once.
+        """
+        from sdk.rpc import RPCClient
+
+        routes = [self.routes[route_id] for route_id in route_ids]
+        problems = [f"{route.dapp} {route.action}: no contract address" for route in routes if not route.contract]
+
+        # the destination RPC is read after a bridge to follow the funds and pick the next route
+        chains = {chain.name: chain for route in routes for chain in (route.src_chain, route.dst_chain)}
+
+        async def check_rpc(chain: Chain) -> str | None:
+            if not chain.rpc:
+                return f"{chain.name}: no RPC endpoint specified"
+
+            try:
+                async with RPCClient(url=chain.rpc) as rpc:
+                    await rpc.get_block_number()
+            except Exception as e:
+                return f"{chain.name}: RPC {chain.rpc} is not reachable ({e})"
+
+        problems += [problem for problem in await asyncio.gather(*map(check_rpc, chains.values())) if problem]
+        return problems
+
+
+ROUTES = RouteRegistry.compile()
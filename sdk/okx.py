@@ -6,9 +6,8 @@ from ccxt.async_support import okx
 from loguru import logger
 
 from sdk import Client
+from sdk.cassette import cassette
 from sdk.constants import (
-    OKX_AFTER_ERROR_SLEEP_TIME,
-    OKX_ON_FAIL_RETRY_COUNT,
     OKX_WAIT_FOR_WITHDRAWAL_FINAL_STATUS_ATTEMPTS,
     OKX_WAIT_FOR_WITHDRAWAL_FINAL_STATUS_MAX_WAIT_TIME,
     OKX_WAIT_FOR_WITHDRAWAL_RECEIVED_ATTEMPTS,
@@ -18,17 +17,22 @@ from sdk.constants import (
 )
 from sdk.models.chain import Polygon, Chain
 from sdk.models.token import USDC_Token, Token
+from sdk.retry import retry_engine
+from sdk.tracer import tracer
 from sdk.utils import retry_on_fail, sleep_pause
 
 
 class OKX:
-    def __init__(self, api_key: str, secret: str, password: str, client: Client) -> None:
+    def __init__(self, api_key: str, secret: str, password: str, client: Client | None) -> None:
         self.client = client
         self._api_key = api_key
         self._secret = secret
         self._password = password
         self.exchange = okx(config=self._get_config())
 
+        if cassette.enabled:
+            self.exchange.fetch = self._cassette_fetch(self.exchange.fetch)
+
     def _get_config(self) -> Dict:
         return {
             "apiKey": self._api_key,
@@ -37,80 +41,98 @@ class OKX:
             "enableRateLimit": True
         }
 
-    @retry_on_fail(tries=RETRIES)
+    @staticmethod
+    def _cassette_fetch(fetch):
+        async def cassette_fetch(url, method="GET", headers=None, body=None):
+            # ccxt signs every request with a timestamp in the headers, so only the url and body identify it
+            return await cassette.exchange(
+                "okx", "okx", f"{method} {url.split('?')[0]}", [url, body], lambda: fetch(url, method, headers, body)
+            )
+
+        return cassette_fetch
+
+    @retry_on_fail(tries=RETRIES, endpoint="okx")
     async def withdraw(
             self,
             amount_to_withdraw: float,
             token: Token | str = USDC_Token,
-            chain: Chain = Polygon,
-            retry_count=0
+            chain: Chain = Polygon
     ) -> str:
+        token_symbol = token if type(token) is str else token.symbol
+
+        try:
+            if type(token) is str:
+                initial_client_balance = await self.client.get_native_balance(chain=chain, use_cache=False) / 10 ** 18
+            else:
+                initial_client_balance = await self.client.get_token_balance(token=token, use_cache=False)
+        except Exception as e:
+            logger.error(f"[OKX] Withdraw of {amount_to_withdraw} {token_symbol} failed: {e}")
+            return False
+
+        withdrawal_id = await self.submit_withdrawal(amount_to_withdraw=amount_to_withdraw, token=token, chain=chain)
+        if not withdrawal_id:
+            return False
+
+        tokens_delivered = await self._watch_for_delivery(
+            initial_client_balance=initial_client_balance,
+            withdrawal_id=withdrawal_id,
+            token=token,
+            chain=chain
+        )
+
+        if tokens_delivered:
+            logger.success(f"[OKX] Successfully withdrew {amount_to_withdraw} {token_symbol}")
+            return True
+        return False
+
+    async def submit_withdrawal(
+            self,
+            amount_to_withdraw: float,
+            token: Token | str = USDC_Token,
+            chain: Chain = Polygon,
+            address: str | None = None
+    ) -> str | bool:
+        """Sends the withdrawal request and returns its id without waiting for the funds to arrive."""
+        token_symbol = token if type(token) is str else token.symbol
+        address = address or self.client.address
+
         async with self.exchange as exchange:
             try:
-                if type(token) is str:
-                    token_symbol = token
-                    initial_client_balance = await self.client.get_native_balance(chain=chain) / 10 ** 18
-                else:
-                    token_symbol = token.symbol
-                    initial_client_balance = await self.client.get_token_balance(token=token)
-
-                logger.info(f"[OKX] Trying to withdraw {amount_to_withdraw} {token_symbol} to {self.client.address}")
+                logger.info(f"[OKX] Trying to withdraw {amount_to_withdraw} {token_symbol} to {address}")
 
                 okx_chain_name = "CELO" if chain.chain_id == 42220 else chain.name
 
-                data = await exchange.withdraw(
-                    token_symbol,
-                    amount_to_withdraw,
-                    self.client.address,
-                    params={
-                        "toAddress": self.client.address,
-                        "chainName": f"{token_symbol}-{okx_chain_name}",
-                        "dest": 4,
-                        "fee": OKX_WITHDRAWAL_CHAIN_TO_DATA[chain.name]["fee"],
-                        "pwd": "-",
-                        "amt": amount_to_withdraw,
-                        "network": okx_chain_name,
-                    },
-                )
-                withdrawal_id = data["info"]["wdId"]
+                with tracer.span("okx.withdraw_request", chain=chain.name, amount=amount_to_withdraw):
+                    data = await retry_engine.run(
+                        exchange.withdraw,
+                        token_symbol,
+                        amount_to_withdraw,
+                        address,
+                        params={
+                            "toAddress": address,
+                            "chainName": f"{token_symbol}-{okx_chain_name}",
+                            "dest": 4,
+                            "fee": OKX_WITHDRAWAL_CHAIN_TO_DATA[chain.name]["fee"],
+                            "pwd": "-",
+                            "amt": amount_to_withdraw,
+                            "network": okx_chain_name,
+                        },
+                        endpoint="okx"
+                    )
+                return data["info"]["wdId"]
 
             except Exception as e:
                 error_message = str(e)
 
                 if "Withdrawal address is not allowlisted for verification exemption" in error_message:
-                    logger.error(f"[OKX] Address {self.client.address} is not allowlisted")
-                    return False
+                    logger.error(f"[OKX] Address {address} is not allowlisted")
                 elif "Insufficient balance" in error_message:
                     logger.error(f"[OKX] Insufficient funds for withdrawal")
-                    return False
                 else:
-                    logger.error(f"[OKX] Error while withdrawing {amount_to_withdraw} {token_symbol}: {error_message}")
-
-                if retry_count < OKX_ON_FAIL_RETRY_COUNT:
-                    logger.info(f"[OKX] Withdrawal unsuccessful, waiting for another try")
-                    await sleep_pause(delay_range=OKX_AFTER_ERROR_SLEEP_TIME, enable_message=False)
-                    return await self.withdraw(
-                        retry_count=retry_count + 1,
-                        amount_to_withdraw=amount_to_withdraw,
-                        token=token,
-                        chain=chain
-                    )
-                else:
-                    logger.error(f"[OKX] Withdraw failed: {str(e)}")
-                    return False
-
-            tokens_delivered = await self._watch_for_delivery(
-                initial_client_balance=initial_client_balance,
-                withdrawal_id=withdrawal_id,
-                token=token,
-                chain=chain
-            )
-
-            if tokens_delivered:
-                logger.success(f"[OKX] Successfully withdrew {amount_to_withdraw} {token_symbol}")
-                return True
-            return False
+                    logger.error(f"[OKX] Withdraw of {amount_to_withdraw} {token_symbol} failed: {error_message}")
+                return False
 
+    @tracer.trace("okx.wait_final_status")
     async def _wait_for_withdrawal_final_status(self, withdrawal_id: str) -> bool:
         attempt_count = 1
         max_wait_time = OKX_WAIT_FOR_WITHDRAWAL_FINAL_STATUS_MAX_WAIT_TIME
@@ -159,6 +181,7 @@ class OKX:
 
         return withdrawal_completed_status and withdrawal_received_status
 
+    @tracer.trace("okx.wait_received")
     async def _wait_for_withdrawal_received(self, initial_balance: float, token: Token | str, chain: Chain) -> bool:
         attempt_count = 0
         max_attempts = OKX_WAIT_FOR_WITHDRAWAL_RECEIVED_ATTEMPTS
@@ -168,9 +191,9 @@ class OKX:
             logger.info(f"[OKX] Waiting for funds on the wallet")
             while attempt_count < max_attempts:
                 if type(token) is str:
-                    final_balance = await self.client.get_native_balance(chain=chain) / 10 ** 18
+                    final_balance = await self.client.get_native_balance(chain=chain, use_cache=False) / 10 ** 18
                 else:
-                    final_balance = await self.client.get_token_balance(token=token)
+                    final_balance = await self.client.get_token_balance(token=token, use_cache=False)
 
                 if final_balance > initial_balance:
                     return True
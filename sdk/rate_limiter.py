@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Dict
+
+from config import RPC_RATE_LIMITS, DEFAULT_RPC_RATE_LIMIT
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1) -> None:
+        async with self._lock:
+            self._refill()
+
+            # a request bigger than the bucket (e.g. a JSON-RPC batch) waits for a full bucket and goes into debt
+            required = min(tokens, self.capacity)
+
+            while self.tokens < required:
+                await asyncio.sleep((required - self.tokens) / self.rate)
+                self._refill()
+
+            self.tokens -= tokens
+
+    def spare_capacity(self) -> float:
+        self._refill()
+        return max(self.tokens, 0) / self.capacity
+
+
+class RateLimiter:
+    """One token bucket per RPC URL, so every endpoint is kept under its own requests-per-second limit."""
+
+    def __init__(
+            self,
+            limits: Dict[str, float] = RPC_RATE_LIMITS,
+            default_rate: float = DEFAULT_RPC_RATE_LIMIT
+    ) -> None:
+        self.limits = limits
+        self.default_rate = default_rate
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        if url not in self._buckets:
+            self._buckets[url] = TokenBucket(rate=self.limits.get(url, self.default_rate))
+        return self._buckets[url]
+
+    async def acquire(self, url: str, tokens: float = 1) -> None:
+        await self.get_bucket(url).acquire(tokens=tokens)
+
+    def spare_capacity(self, url: str) -> float:
+        return self.get_bucket(url).spare_capacity()
+
+    def middleware(self, url: str):
+        async def rate_limit_middleware(make_request, w3):
+            async def middleware(method, params):
+                await self.acquire(url)
+                return await make_request(method, params)
+
+            return middleware
+
+        return rate_limit_middleware
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict
+
+from sdk.constants import RETRY_POLICIES, CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_TIME
+from sdk.logger import logger
+from sdk.metrics import get_action_metrics, record_action_error
+
+
+class ErrorKind(Enum):
+    TRANSIENT = "transient"
+    RATE_LIMIT = "rate_limit"
+    NONCE = "nonce"
+    INSUFFICIENT_FUNDS = "insufficient_funds"
+    PERMANENT = "permanent"
+
+
+# substrings of lower-cased error messages, checked in order
+ERROR_PATTERNS = (
+    (ErrorKind.RATE_LIMIT, ("429", "too many requests", "rate limit", "exceeded the quota", "request limit")),
+    (ErrorKind.NONCE, ("nonce too low", "nonce too high", "replacement transaction underpriced")),
+    (ErrorKind.INSUFFICIENT_FUNDS, ("insufficient funds", "insufficient balance", "exceeds balance")),
+    (ErrorKind.PERMANENT, ("execution reverted", "revert", "invalid opcode", "not allowlisted", "invalid api key")),
+    (ErrorKind.TRANSIENT, ("timeout", "timed out", "connection", "temporarily", "unavailable", "bad gateway",
+                           "header not found", "internal error", "reset by peer")),
+)
+
+# exception class names (anywhere in the MRO) that identify the kind without looking at the message,
+# so that ccxt, aiohttp and web3 don't have to be imported here
+ERROR_CLASS_NAMES = (
+    (ErrorKind.RATE_LIMIT, ("RateLimitExceeded", "DDoSProtection")),
+    (ErrorKind.INSUFFICIENT_FUNDS, ("InsufficientFunds",)),
+    (ErrorKind.PERMANENT, ("TransactionSimulationError", "ContractLogicError", "AuthenticationError",
+                           "PermissionDenied", "BadRequest", "BadSymbol", "NoRPCEndpointSpecifiedError")),
+    (ErrorKind.TRANSIENT, ("TimeoutError", "NetworkError", "RequestTimeout", "ExchangeNotAvailable",
+                           "ClientConnectionError", "ServerDisconnectedError", "ConnectionError", "TimeExhausted")),
+)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, endpoint: str, retry_after: float, *args: object) -> None:
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        self.message = f"Circuit breaker for {endpoint} is open, retry in {retry_after:.0f}s"
+        super().__init__(self.message, *args)
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    if isinstance(error, CircuitOpenError):
+        return ErrorKind.TRANSIENT
+
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        if status == 429:
+            return ErrorKind.RATE_LIMIT
+        if status >= 500:
+            return ErrorKind.TRANSIENT
+        if status >= 400:
+            return ErrorKind.PERMANENT
+
+    message = str(error).lower()
+
+    for kind, patterns in ERROR_PATTERNS:
+        if any(pattern in message for pattern in patterns):
+            return kind
+
+    class_names = {cls.__name__ for cls in type(error).__mro__}
+
+    for kind, names in ERROR_CLASS_NAMES:
+        if class_names.intersection(names):
+            return kind
+
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError)):
+        return ErrorKind.TRANSIENT
+
+    return ErrorKind.PERMANENT
+
+
+def get_backoff_delay(kind: ErrorKind, attempt: int) -> float:
+    """Exponential backoff with full jitter, ``attempt`` starts from 0."""
+    policy = RETRY_POLICIES[kind.value]
+    return random.uniform(0, min(policy["max-delay"], policy["base-delay"] * 2 ** attempt))
+
+
+def record_error(error: Exception) -> ErrorKind:
+    """Classifies ``error`` and remembers it as the last error of the running warmup action."""
+    kind = classify_error(error)
+    record_action_error(kind.value, f"{type(error).__name__}: {error}")
+    return kind
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive transient failures of an endpoint.
+
+    While open every call fails fast, after ``reset_time`` seconds one trial call is let through
+    (half-open) and its result either closes the breaker or opens it again.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_time: float = CIRCUIT_BREAKER_RESET_TIME
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_time = reset_time
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0
+        return max(self.opened_at + self.reset_time - time.monotonic(), 0)
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+
+        if self.retry_after() > 0 or self._trial_running:
+            return False
+
+        self._trial_running = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class RetryEngine:
+    """Retries calls according to the class of the raised error and keeps one circuit breaker per endpoint.
+
+    Reverts, insufficient funds and other permanent errors are re-raised right away,
+    transient, rate-limit and nonce errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(self) -> None:
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get_breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self._breakers:
+            self._breakers[endpoint] = CircuitBreaker()
+        return self._breakers[endpoint]
+
+    async def run(
+            self,
+            func: Callable[..., Awaitable[Any]],
+            *args,
+            endpoint: str | None = None,
+            **kwargs
+    ) -> Any:
+        breaker = self.get_breaker(endpoint) if endpoint else None
+        attempts: Dict[ErrorKind, int] = {}
+
+        while True:
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(endpoint=endpoint, retry_after=breaker.retry_after())
+
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                kind = record_error(e)
+
+                if breaker is not None:
+                    if kind in (ErrorKind.TRANSIENT, ErrorKind.RATE_LIMIT):
+                        breaker.record_failure()
+                    else:
+                        # the endpoint answered, the request itself was wrong
+                        breaker.record_success()
+
+                attempt = attempts.get(kind, 0)
+                if attempt + 1 >= RETRY_POLICIES[kind.value]["tries"]:
+                    raise
+
+                attempts[kind] = attempt + 1
+
+                metrics = get_action_metrics()
+                if metrics is not None:
+                    metrics.add_retry()
+
+                delay = get_backoff_delay(kind=kind, attempt=attempt)
+                logger.warning(
+                    f"[Retry] {getattr(func, '__qualname__', func)} failed ({kind.value}): {e}, "
+                    f"retrying in {delay:.1f}s",
+                    send_to_tg=False
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+
+retry_engine = RetryEngine()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import itertools
+from typing import Any, List
+
+import aiohttp
+
+from sdk.cassette import cassette
+from sdk.rate_limiter import rate_limiter
+
+
+class RPCError(Exception):
+    def __init__(self, error: dict, *args: object) -> None:
+        self.error = error
+        self.message = f"RPC error: {error.get('message', error)}"
+        super().__init__(self.message, *args)
+
+
+class RPCClient:
+    """Minimal JSON-RPC client for read-only calls that don't need web3.
+
+    Importing web3 takes more than a second, which dominates short read-only runs such as
+    the balance checker. Supports JSON-RPC batches and shares the per-RPC rate limits with Client.
+    """
+
+    def __init__(self, url: str, proxy: str | None = None) -> None:
+        self.url = url
+        self.proxy = f"http://{proxy}" if proxy else None
+        self._ids = itertools.count(1)
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> "RPCClient":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def _request(self, method: str, params: list) -> dict:
+        return {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+
+    async def _post(self, payload: Any, tokens: int = 1) -> Any:
+        method = "batch" if isinstance(payload, list) else payload["method"]
+        return await cassette.exchange("rpc", self.url, method, _without_ids(payload), lambda: self._send(payload, tokens))
+
+    async def _send(self, payload: Any, tokens: int) -> Any:
+        await rate_limiter.acquire(self.url, tokens=tokens)
+
+        async with self._get_session().post(self.url, json=payload, proxy=self.proxy) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def call(self, method: str, params: list) -> Any:
+        response = await self._post(self._request(method, params))
+
+        if "error" in response:
+            raise RPCError(response["error"])
+
+        return response["result"]
+
+    async def batch(self, calls: List[tuple[str, list]]) -> List[Any]:
+        """Sends several calls in one HTTP request, failed calls are returned as RPCError instances."""
+        if not calls:
+            return []
+
+        requests = [self._request(method, params) for method, params in calls]
+        responses = await self._post(requests, tokens=len(requests))
+
+        if isinstance(responses, dict):
+            raise RPCError(responses.get("error", responses))
+
+        by_id = {response.get("id"): response for response in responses}
+        results = []
+
+        for request in requests:
+            response = by_id.get(request["id"], {"error": {"message": "missing response"}})
+            results.append(RPCError(response["error"]) if "error" in response else response["result"])
+
+        return results
+
+    async def get_balance(self, address: str, block: str | int = "latest") -> int:
+        return int(await self.call("eth_getBalance", [address, _to_block_id(block)]), 16)
+
+    async def get_transaction_count(self, address: str, block: str | int = "latest") -> int:
+        return int(await self.call("eth_getTransactionCount", [address, _to_block_id(block)]), 16)
+
+    async def get_block_number(self) -> int:
+        return int(await self.call("eth_blockNumber", []), 16)
+
+
+def _to_block_id(block: str | int) -> str:
+    return hex(block) if isinstance(block, int) else block
+
+
+def _without_ids(payload: Any) -> Any:
+    # request ids only count the calls of one client, they don't identify the request
+    if isinstance(payload, list):
+        return [_without_ids(request) for request in payload]
+    return [payload["method"], payload["params"]]
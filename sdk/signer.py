@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from eth_keys import keys
+from eth_utils import to_bytes
+
+from sdk.constants import SIGNER_PROCESSES, SIGNER_BATCH_THRESHOLD
+
+try:
+    # eth_keys switches to the libsecp256k1 backend by itself when coincurve is installed
+    import coincurve  # noqa: F401
+
+    NATIVE_BACKEND = True
+except ImportError:
+    NATIVE_BACKEND = False
+
+
+def _sign_transaction(tx_params: dict, private_key: str) -> bytes:
+    # eth_account pulls in a lot of modules, it is imported only once something has to be signed
+    from eth_account import Account
+
+    return Account.sign_transaction(tx_params, private_key).rawTransaction
+
+
+def _derive_address(private_key: str) -> str:
+    return keys.PrivateKey(to_bytes(hexstr=private_key)).public_key.to_checksum_address()
+
+
+class Signer:
+    """Signs transactions and derives addresses without blocking the event loop.
+
+    With the native secp256k1 backend the operations take microseconds and run inline,
+    otherwise the pure-Python elliptic-curve math is done in a process pool.
+    Derived addresses are cached per private key.
+    """
+
+    def __init__(self, processes: int = SIGNER_PROCESSES) -> None:
+        self.processes = processes
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_pid: int | None = None
+        self._addresses: Dict[str, str] = {}
+
+    @property
+    def use_pool(self) -> bool:
+        return not NATIVE_BACKEND and self.processes > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # a pool inherited through fork() is managed by a thread of the parent only, it would never answer here
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown()
+        self._executor = None
+
+    async def sign_transaction(self, tx_params: dict, private_key: str) -> bytes:
+        if not self.use_pool:
+            return _sign_transaction(tx_params, private_key)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), _sign_transaction, tx_params, private_key)
+
+    def derive_address(self, private_key: str) -> str:
+        if private_key not in self._addresses:
+            self._addresses[private_key] = _derive_address(private_key)
+        return self._addresses[private_key]
+
+    def derive_addresses(self, private_keys: List[str]) -> List[str]:
+        missing = [private_key for private_key in dict.fromkeys(private_keys) if private_key not in self._addresses]
+
+        if self.use_pool and len(missing) >= SIGNER_BATCH_THRESHOLD:
+            chunksize = max(len(missing) // (self.processes * 4), 1)
+            addresses = self._get_executor().map(_derive_address, missing, chunksize=chunksize)
+            self._addresses.update(zip(missing, addresses))
+
+        return [self.derive_address(private_key) for private_key in private_keys]
+
+
+signer = Signer()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from enum import Enum
+
+from eth_abi import decode
+from web3.exceptions import ContractLogicError
+
+# func selector for "Error(string)"
+ERROR_STRING_SELECTOR = "0x08c379a0"
+
+
+class RevertKind(Enum):
+    INSUFFICIENT_FUNDS = "insufficient funds"
+    INSUFFICIENT_FEE = "insufficient fee"
+    AMOUNT_TOO_LARGE = "amount too large"
+    STALE_QUOTE = "stale quote / slippage"
+    INSUFFICIENT_ALLOWANCE = "insufficient allowance"
+    UNKNOWN = "unknown revert"
+
+
+# substrings of lower-cased revert reasons, checked in order
+REVERT_PATTERNS = (
+    (RevertKind.AMOUNT_TOO_LARGE, ("dstnativeamt too large", "amount too large", "exceeds max")),
+    (RevertKind.INSUFFICIENT_FUNDS, ("insufficient funds", "transfer amount exceeds balance", "insufficient balance")),
+    (RevertKind.INSUFFICIENT_FEE, ("not enough native for fees", "insufficient fee", "msg.value", "fee")),
+    (RevertKind.INSUFFICIENT_ALLOWANCE, ("allowance", "transfer_from_failed")),
+    (RevertKind.STALE_QUOTE, ("slippage", "expired", "deadline", "too little received", "incorrect_sell_amount")),
+)
+
+
+class TransactionSimulationError(Exception):
+    def __init__(self, reason: str, kind: RevertKind = RevertKind.UNKNOWN, *args: object) -> None:
+        self.reason = reason
+        self.kind = kind
+        self.message = f"Transaction simulation failed ({kind.value}): {reason}"
+        super().__init__(self.message, *args)
+
+
+def decode_revert_reason(error: Exception) -> str | None:
+    """Extracts a human-readable revert reason from an ``eth_call`` error.
+
+    Returns ``None`` when the error is not a revert (timeouts, connection errors, etc.).
+    """
+    if isinstance(error, ContractLogicError):
+        reason = str(error)
+        data = getattr(error, "data", None)
+        if isinstance(data, str) and data.startswith(ERROR_STRING_SELECTOR):
+            try:
+                reason = decode(["string"], bytes.fromhex(data[10:]))[0]
+            except Exception:
+                pass
+        return reason.removeprefix("execution reverted: ")
+
+    # other RPC errors ("header not found", "limit exceeded", ...) carry a dict too, only reverts are decoded
+    if isinstance(error, ValueError) and error.args and isinstance(error.args[0], dict):
+        payload = error.args[0]
+        message = str(payload.get("message") or "")
+        data = payload.get("data")
+
+        if isinstance(data, str) and data.startswith(ERROR_STRING_SELECTOR):
+            try:
+                return decode(["string"], bytes.fromhex(data[10:]))[0]
+            except Exception:
+                return message or data
+
+        if _is_revert_message(message):
+            return message.removeprefix("execution reverted: ")
+
+        return None
+
+    if _is_revert_message(str(error)):
+        return str(error)
+
+    return None
+
+
+def _is_revert_message(message: str) -> bool:
+    message = message.lower()
+    return "revert" in message or "insufficient funds" in message
+
+
+def classify_revert(reason: str) -> RevertKind:
+    reason = reason.lower()
+
+    for kind, patterns in REVERT_PATTERNS:
+        if any(pattern in reason for pattern in patterns):
+            return kind
+
+    return RevertKind.UNKNOWN
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List
+
+from config import USE_TRACING
+from sdk.constants import TRACE_PATH
+from sdk.logger import logger
+from sdk.metrics import get_action_metrics
+
+_wallet_context: ContextVar[str | None] = ContextVar("trace_wallet", default=None)
+
+
+class Tracer:
+    """Collects phase spans and writes them in the Chrome trace-event format.
+
+    Every wallet gets its own process track and every chain its own thread track
+    inside it, so the result can be opened in chrome://tracing or ui.perfetto.dev.
+    """
+
+    def __init__(self, enabled: bool = USE_TRACING) -> None:
+        self.enabled = enabled
+        self.events: List[Dict] = []
+        self._pids: Dict[str, int] = {}
+        self._tids: Dict[tuple[int, str], int] = {}
+        self._origin = time.perf_counter()
+
+    def set_wallet(self, wallet: str | None) -> None:
+        _wallet_context.set(wallet)
+
+    def _pid(self, wallet: str) -> int:
+        if wallet not in self._pids:
+            self._pids[wallet] = len(self._pids) + 1
+            self.events.append({
+                "name": "process_name", "ph": "M", "pid": self._pids[wallet], "tid": 0,
+                "args": {"name": wallet}
+            })
+        return self._pids[wallet]
+
+    def _tid(self, pid: int, chain: str) -> int:
+        if (pid, chain) not in self._tids:
+            self._tids[(pid, chain)] = len(self._tids) + 1
+            self.events.append({
+                "name": "thread_name", "ph": "M", "pid": pid, "tid": self._tids[(pid, chain)],
+                "args": {"name": chain}
+            })
+        return self._tids[(pid, chain)]
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self._origin) * 1_000_000
+
+    @contextmanager
+    def span(self, name: str, chain: str | None = None, **args):
+        metrics = get_action_metrics()
+
+        if not self.enabled and metrics is None:
+            yield
+            return
+
+        start = self._now()
+        try:
+            yield
+        finally:
+            # phase durations of the current warmup action are collected for the analytics store
+            if metrics is not None:
+                metrics.add_phase(name, (self._now() - start) / 1_000_000)
+
+            if not self.enabled:
+                return
+
+            pid = self._pid(_wallet_context.get() or "main")
+            self.events.append({
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": start,
+                "dur": self._now() - start,
+                "pid": pid,
+                "tid": self._tid(pid, chain or "-"),
+                "args": {key: str(value) for key, value in args.items()},
+            })
+
+    def trace(self, name: str):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(obj, *args, **kwargs):
+                with self.span(name, chain=_get_chain_name(obj)):
+                    return await func(obj, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def export(self, file_name: str = TRACE_PATH) -> None:
+        if not self.enabled or not self.events:
+            return
+
+        try:
+            directory = os.path.dirname(file_name)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            with open(file_name, "w") as trace_file:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file)
+
+            logger.info(f"[Tracer] Trace saved to {file_name}", send_to_tg=False)
+        except Exception as e:
+            logger.error(f"[Tracer] Could not save trace: {e}", send_to_tg=False)
+
+
+def _get_chain_name(obj) -> str | None:
+    chain = getattr(obj, "chain", None)
+    if chain is None:
+        account = getattr(obj, "account", None) or getattr(obj, "client", None)
+        chain = getattr(account, "chain", None)
+    return getattr(chain, "name", None)
+
+
+tracer = Tracer()
@@ -1,17 +1,18 @@
+from __future__ import annotations
+
 import asyncio
 import functools
 import json
 import random
 from typing import List
 
-import aiohttp
-from tqdm import tqdm
-
 from config import PROXY_CHANGE_IP_URL
 from sdk.logger import logger
 
 
 async def change_ip() -> None:
+    import aiohttp
+
     async with aiohttp.ClientSession() as session:
         async with session.get(url=PROXY_CHANGE_IP_URL) as response:
             if response.status == 200:
@@ -51,6 +52,8 @@ async def sleep_pause(delay_range: List[int], enable_message: bool = True, enabl
         logger.info(f"Sleeping for {delay} seconds...")
 
     if enable_pr_bar:
+        from tqdm import tqdm
+
         with tqdm(total=delay, desc="Waiting", unit="s", dynamic_ncols=True, colour="blue") as pbar:
             for _ in range(delay):
                 await asyncio.sleep(delay=1)
@@ -59,21 +62,40 @@ async def sleep_pause(delay_range: List[int], enable_message: bool = True, enabl
         await asyncio.sleep(delay=delay)
 
 
-def retry_on_fail(tries: int, retry_delay=None):
-    if retry_delay is None:
-        retry_delay = [5, 10]
+def retry_on_fail(tries: int, retry_delay=None, endpoint: str | None = None):
+    """Retries a call that returned ``None``/``False`` up to ``tries`` times.
+
+    Raised errors are retried by the retry engine according to their class, with a circuit breaker
+    for ``endpoint`` (by default the RPC of the chain the call is made on).
+    """
+    # sdk.retry depends on sdk.constants, which imports this module
+    from sdk.retry import ErrorKind, get_backoff_delay, retry_engine
 
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            for _ in range(tries):
-                result = await func(*args, **kwargs)
-                if result is None or result is False:
-                    await sleep_pause(delay_range=retry_delay, enable_message=False)
-                else:
+            for attempt in range(tries):
+                result = await retry_engine.run(func, *args, endpoint=endpoint or _get_endpoint(args, kwargs), **kwargs)
+                if result is not None and result is not False:
                     return result
+
+                if attempt + 1 < tries:
+                    if retry_delay is None:
+                        await asyncio.sleep(get_backoff_delay(kind=ErrorKind.TRANSIENT, attempt=attempt))
+                    else:
+                        await sleep_pause(delay_range=retry_delay, enable_message=False)
             return False
 
         return wrapper
 
     return decorator
+
+
+def _get_endpoint(args: tuple, kwargs: dict) -> str | None:
+    chain = kwargs.get("chain")
+
+    if chain is None and args:
+        client = getattr(args[0], "account", None) or getattr(args[0], "client", None) or args[0]
+        chain = getattr(client, "chain", None)
+
+    return getattr(chain, "rpc", None) or None